@@ -6,11 +6,98 @@ import time
 import signal
 import threading
 from bson import ObjectId, BSON
+from collections import deque
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import argparse
 
 shutdown_event = threading.Event()
+METRICS_PREFIX = "pcsm_loadgen_"
+QUANTILES = (0.5, 0.95, 0.99, 0.999)
+
+# Same pcsm_loadgen_* exposition as pcsm-pytest/loadgen_metrics.py: rate and latency quantiles over
+# the last `window` seconds. Kept standalone because the playbooks copy this script alone to the hosts
+class LoadMetrics:
+    def __init__(self, window=10):
+        self.lock = threading.Lock()
+        self.documents = 0
+        self.bytes = 0
+        self.batches = 0
+        self.errors = 0
+        self.latency_sum = 0.0
+        self.window = window
+        self.samples = deque()
+
+    def record_batch(self, docs, nbytes, latency):
+        now = time.time()
+        with self.lock:
+            self.documents += docs
+            self.bytes += nbytes
+            self.batches += 1
+            self.latency_sum += latency
+            self.samples.append((now, self.documents, latency))
+            while self.samples and self.samples[0][0] < now - self.window:
+                self.samples.popleft()
+
+    def record_error(self):
+        with self.lock:
+            self.errors += 1
+
+    def render(self):
+        with self.lock:
+            latencies = sorted(latency for _, _, latency in self.samples)
+            samples = list(self.samples)
+            documents, nbytes, batches, errors, latency_sum = (
+                self.documents, self.bytes, self.batches, self.errors, self.latency_sum)
+        rate = 0.0
+        if len(samples) > 1 and samples[-1][0] > samples[0][0]:
+            rate = (samples[-1][1] - samples[0][1]) / (samples[-1][0] - samples[0][0])
+        lines = [
+            f"# HELP {METRICS_PREFIX}documents_total Documents written per operation type",
+            f"# TYPE {METRICS_PREFIX}documents_total counter",
+            f'{METRICS_PREFIX}documents_total{{op="insert"}} {documents}',
+            f"# HELP {METRICS_PREFIX}bytes_written_total Encoded document bytes written per operation type",
+            f"# TYPE {METRICS_PREFIX}bytes_written_total counter",
+            f'{METRICS_PREFIX}bytes_written_total{{op="insert"}} {nbytes}',
+            f"# HELP {METRICS_PREFIX}errors_total Failed operations per type",
+            f"# TYPE {METRICS_PREFIX}errors_total counter",
+            f'{METRICS_PREFIX}errors_total{{op="insert"}} {errors}',
+            f"# HELP {METRICS_PREFIX}ops_per_second Documents per second over the last {self.window}s",
+            f"# TYPE {METRICS_PREFIX}ops_per_second gauge",
+            f'{METRICS_PREFIX}ops_per_second{{op="insert"}} {rate:.3f}',
+            f"# HELP {METRICS_PREFIX}latency_seconds Operation latency, quantiles over the last {self.window}s",
+            f"# TYPE {METRICS_PREFIX}latency_seconds summary",
+        ]
+        for q in QUANTILES:
+            value = latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0
+            lines.append(f'{METRICS_PREFIX}latency_seconds{{op="insert",quantile="{q:g}"}} {value:.6f}')
+        lines.append(f'{METRICS_PREFIX}latency_seconds_sum{{op="insert"}} {latency_sum:.6f}')
+        lines.append(f'{METRICS_PREFIX}latency_seconds_count{{op="insert"}} {batches}')
+        return "\n".join(lines) + "\n"
+
+load_metrics = LoadMetrics()
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = load_metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port):
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    log(f"Serving Prometheus metrics on port {port}")
+    return server
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Load test data into MongoDB")
@@ -20,6 +107,12 @@ def parse_args():
         default=27017,
         help="MongoDB port to connect to (default: 27017)",
     )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=int(os.getenv("METRICS_PORT", 0)),
+        help="Serve Prometheus metrics on this port at /metrics (default: METRICS_PORT env or 0, disabled)",
+    )
     return parser.parse_args()
 
 def log(msg):
@@ -77,14 +170,17 @@ def get_template_doc(args):
 def estimate_doc_size(template):
     return len(BSON.encode(template))
 
-def insert_documents(collection, docs):
+def insert_documents(collection, docs, doc_size=0):
+    start = time.perf_counter()
     try:
         collection.insert_many(docs, ordered=False, bypass_document_validation=True)
     except Exception as e:
+        load_metrics.record_error()
         return str(e)
+    load_metrics.record_batch(len(docs), len(docs) * doc_size, time.perf_counter() - start)
     return None
 
-def collection_worker(collection_name, count, template_type, pool_data, db_name, port):
+def collection_worker(collection_name, count, template_type, pool_data, db_name, port, doc_size=0):
     try:
         client = pymongo.MongoClient(f"mongodb://127.0.0.1:{port}")
         db = client[db_name]
@@ -94,7 +190,7 @@ def collection_worker(collection_name, count, template_type, pool_data, db_name,
         while inserted < count and not shutdown_event.is_set():
             current_batch = min(batch_size, count - inserted)
             docs = [get_template_doc((template_type, pool_data)) for _ in range(current_batch)]
-            error = insert_documents(collection, docs)
+            error = insert_documents(collection, docs, doc_size)
             if error:
                 log(f"[{collection_name}] Error: {error}")
                 break
@@ -159,7 +255,8 @@ def load_data(port):
         doc_counts = [base + 1 if i < remainder else base for i in range(total_collections)]
 
     with ThreadPoolExecutor(max_workers=max_threads) as executor:
-        futures = [executor.submit(collection_worker, f"collection{i}", count, template_type, pool_data, db_name, port)
+        futures = [executor.submit(collection_worker, f"collection{i}", count, template_type, pool_data, db_name, port,
+                                   estimated_doc_size)
             for i, count in enumerate(doc_counts)]
         for future in as_completed(futures):
             try:
@@ -171,5 +268,7 @@ def load_data(port):
 
 if __name__ == "__main__":
     args = parse_args()
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
     enable_and_shard_all_collections(args.port, int(os.getenv("COLLECTIONS", 5)))
     load_data(args.port)
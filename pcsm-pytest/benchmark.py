@@ -0,0 +1,366 @@
+import csv
+import os
+import random
+import string
+import time
+import pymongo
+from threading import Thread, Event, Lock
+from bson import BSON
+
+from cluster import Cluster
+from metrics_collector import PCSM_METRIC_PREFIX, collect_metrics
+
+# Helpers shared by the PCSM benchmarks (test_bench_*.py). Benchmarks are marked with
+# @pytest.mark.benchmark and only collected with --benchmark, every benchmark logs a
+# results table and saves it to graphs/bench_<name>.csv
+
+SYSTEM_DBS = ("admin", "local", "config")
+
+def seed_collections(connection_string, db_name="bench", num_collections=4, docs_per_collection=100_000,
+                     doc_size=1024, batch_size=1000, seed=42, is_sharded=False):
+    """
+    Creates a reproducible dataset with integer _id and a payload of doc_size
+    bytes, returns the total BSON size of the inserted documents
+    """
+    rng = random.Random(seed)
+    payloads = ["".join(rng.choices(string.ascii_letters, k=doc_size)) for _ in range(64)]
+    client = pymongo.MongoClient(connection_string)
+    client.drop_database(db_name)
+    if is_sharded:
+        client.admin.command("enableSharding", db_name)
+    total_bytes = 0
+    Cluster.log(f"Seeding {db_name}: {num_collections} x {docs_per_collection} docs of ~{doc_size} bytes")
+    for i in range(num_collections):
+        coll_name = f"collection_{i}"
+        if is_sharded:
+            client.admin.command("shardCollection", f"{db_name}.{coll_name}", key={"_id": "hashed"})
+        collection = client[db_name][coll_name]
+        for offset in range(0, docs_per_collection, batch_size):
+            docs = [{"_id": j, "n": rng.randrange(1_000_000), "payload": payloads[j % len(payloads)]}
+                    for j in range(offset, min(offset + batch_size, docs_per_collection))]
+            total_bytes += len(BSON.encode(docs[0])) * len(docs)
+            collection.insert_many(docs, ordered=False)
+    return total_bytes
+
+def drop_target_data(dst_cluster):
+    """
+    Drops everything replicated to the target, including PCSM state
+    """
+    client = pymongo.MongoClient(dst_cluster.connection)
+    for db_name in client.list_database_names():
+        if db_name not in SYSTEM_DBS:
+            client.drop_database(db_name)
+
+def reset_sync(csync, dst_cluster, log_level="info", env_vars=None):
+    """
+    Cleans the target and recreates the csync container so the next run starts from scratch
+    """
+    drop_target_data(dst_cluster)
+    csync.create(log_level=log_level, env_vars=env_vars, extra_args="--reset-state")
+
+def wait_for_clone(csync, timeout=3600, interval=0.2):
+    """
+    Returns seconds until initialSync.cloneCompleted is reported
+    or None if csync failed or did not finish the clone in time
+    """
+    start_time = time.time()
+    while time.time() - start_time < timeout:
+        status = csync.status(timeout=10)
+        if status.get("success") and not status["data"].get("ok", True):
+            Cluster.log(f"Clone failed: {status['data'].get('error')}")
+            return None
+        initial_sync = (status.get("data") or {}).get("initialSync") or {}
+        if initial_sync.get("cloneCompleted"):
+            return time.time() - start_time
+        time.sleep(interval)
+    Cluster.log(f"Clone did not complete within {timeout} seconds")
+    return None
+
+def sync_and_finalize(sync, raw_args=None, timeout=3600):
+    """
+    Starts sync, waits for the clone and zero lag and finalizes,
+    returns (clone seconds, finalize seconds)
+    """
+    assert sync.start(raw_args=raw_args), "Failed to start csync"
+    clone_seconds = wait_for_clone(sync, timeout=timeout)
+    assert clone_seconds is not None, "Clone did not complete"
+    assert sync.wait_for_zero_lag(), "Failed to catch up on replication"
+    finalize_start = time.time()
+    assert sync.finalize(timeout=timeout), "Failed to finalize csync service"
+    return clone_seconds, time.time() - finalize_start
+
+def count_mismatches(src_cluster, dst_cluster, db_name):
+    """
+    Returns namespaces whose document count differs between src and dst
+    """
+    src = pymongo.MongoClient(src_cluster.connection)[db_name]
+    dst = pymongo.MongoClient(dst_cluster.connection)[db_name]
+    mismatches = []
+    for coll_name in src.list_collection_names():
+        src_count = src[coll_name].estimated_document_count()
+        dst_count = dst[coll_name].count_documents({})
+        if src_count != dst_count:
+            mismatches.append(f"{db_name}.{coll_name}: {src_count} != {dst_count}")
+    return mismatches
+
+class ContainerSampler:
+    """
+    Samples docker CPU and memory of the cluster containers
+    in the background using metrics_collector.collect_metrics
+    """
+    def __init__(self):
+        self.data = {}
+        self._event = Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = Thread(target=lambda: self.data.update(collect_metrics(self._event)), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._event.set()
+        self._thread.join()
+        return self
+
+    def peaks(self, names):
+        """
+        Returns (avg cpu %, peak cpu %, peak memory MB) summed over the containers
+        """
+        avg_cpu = peak_cpu = peak_mem = 0.0
+        for name in names:
+            metrics = self.data.get(name)
+            if not metrics or not metrics["cpu"]:
+                continue
+            avg_cpu += sum(metrics["cpu"]) / len(metrics["cpu"])
+            peak_cpu += max(metrics["cpu"])
+            peak_mem += max(metrics["memory"])
+        return round(avg_cpu, 1), round(peak_cpu, 1), round(peak_mem, 1)
+
+class BenchmarkResults:
+    def __init__(self, name):
+        self.name = name
+        self.rows = []
+
+    def add(self, **row):
+        self.rows.append(row)
+        Cluster.log(f"[{self.name}] {row}")
+
+    def best(self, key, group_by=None, maximize=True):
+        """
+        Returns the best row by key, or a dict of best rows per group_by value
+        """
+        rows = [row for row in self.rows if row.get(key) is not None]
+        pick = max if maximize else min
+        if group_by is None:
+            return pick(rows, key=lambda row: row[key]) if rows else None
+        groups = {}
+        for row in rows:
+            groups.setdefault(row.get(group_by), []).append(row)
+        return {group: pick(group_rows, key=lambda row: row[key]) for group, group_rows in groups.items()}
+
+    def columns(self):
+        columns = []
+        for row in self.rows:
+            columns.extend(key for key in row if key not in columns)
+        return columns
+
+    def table(self):
+        columns = self.columns()
+        widths = {col: max(len(col), *(len(str(row.get(col, ""))) for row in self.rows)) for col in columns}
+        lines = [" | ".join(col.ljust(widths[col]) for col in columns),
+                 "-+-".join("-" * widths[col] for col in columns)]
+        for row in self.rows:
+            lines.append(" | ".join(str(row.get(col, "")).ljust(widths[col]) for col in columns))
+        return "\n".join(lines)
+
+    def write(self):
+        if not self.rows:
+            return None
+        filename = f"graphs/bench_{self.name}.csv"
+        with open(filename, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self.columns())
+            writer.writeheader()
+            writer.writerows(self.rows)
+        os.chmod(filename, 0o666)
+        Cluster.log(f"{self.name} results ({filename}):\n{self.table()}")
+        return filename
+
+class RateWriter:
+    """
+    Writes to the source at a target number of operations per second from several
+    threads, each batch is one bulk_write and the rate can be changed while running
+    """
+    # share of inserts, updates and deletes in "mixed" mode
+    MIXED = (0.5, 0.4, 0.1)
+
+    def __init__(self, connection_string, db_name="bench_load", collection="load", ops_per_sec=1000,
+                 threads=4, batch_size=100, doc_size=256, mode="insert", seed=42):
+        self.client = pymongo.MongoClient(connection_string)
+        self.collection = self.client[db_name][collection]
+        self.ops_per_sec = ops_per_sec
+        self.threads = threads
+        self.batch_size = batch_size
+        self.mode = mode
+        self.payload = "".join(random.Random(seed).choices(string.ascii_letters, k=doc_size))
+        self.seed = seed
+        self.ops = 0
+        self.errors = 0
+        self._lock = Lock()
+        self._event = Event()
+        self._workers = []
+        self._generation = 0
+
+    def set_rate(self, ops_per_sec):
+        self.ops_per_sec = ops_per_sec
+
+    def start(self):
+        self._event.clear()
+        self._generation += 1
+        self._workers = [Thread(target=self._run, args=(i,), daemon=True) for i in range(self.threads)]
+        for worker in self._workers:
+            worker.start()
+        return self
+
+    def stop(self):
+        self._event.set()
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def _batch(self, rng, next_id, oldest_id):
+        requests = []
+        inserts, updates, _ = self.MIXED if self.mode == "mixed" else (1, 0, 0)
+        for _ in range(self.batch_size):
+            choice = rng.random()
+            if choice < inserts or next_id - oldest_id < self.batch_size:
+                requests.append(pymongo.InsertOne({"_id": next_id, "n": 0, "payload": self.payload}))
+                next_id += 1
+            elif choice < inserts + updates:
+                requests.append(pymongo.UpdateOne({"_id": rng.randrange(oldest_id, next_id)}, {"$inc": {"n": 1}}))
+            else:
+                requests.append(pymongo.DeleteOne({"_id": oldest_id}))
+                oldest_id += 1
+        return requests, next_id, oldest_id
+
+    def _run(self, index):
+        rng = random.Random(self.seed + index)
+        # disjoint _id ranges per thread and start() call, same seed gives the same operations
+        next_id = oldest_id = (index + 1) * 10**12 + self._generation * 10**9
+        deadline = time.time()
+        while not self._event.is_set():
+            requests, next_id, oldest_id = self._batch(rng, next_id, oldest_id)
+            try:
+                self.collection.bulk_write(requests, ordered=False)
+                with self._lock:
+                    self.ops += len(requests)
+            except pymongo.errors.PyMongoError:
+                with self._lock:
+                    self.errors += 1
+            per_thread_rate = max(self.ops_per_sec / self.threads, 1)
+            deadline = max(deadline + len(requests) / per_thread_rate, time.time() - 1)
+            delay = deadline - time.time()
+            if delay > 0:
+                self._event.wait(delay)
+
+def sample_repl_metrics(csync, duration, interval=1.0):
+    """
+    Returns [(elapsed, lag_time_seconds, repl_event_queue_size, events_applied_total)]
+    scraped from csync /metrics for duration seconds
+    """
+    samples = []
+    start_time = time.time()
+    while time.time() - start_time < duration:
+        scraped_at = time.time()
+        response = csync.metrics(timeout=10)
+        if response.get("success"):
+            data = response["data"]
+            samples.append((scraped_at - start_time,
+                            data.get(f"{PCSM_METRIC_PREFIX}lag_time_seconds", 0),
+                            data.get(f"{PCSM_METRIC_PREFIX}repl_event_queue_size", 0),
+                            data.get(f"{PCSM_METRIC_PREFIX}events_applied_total", 0)))
+        time.sleep(max(0.0, interval - (time.time() - scraped_at)))
+    return samples
+
+def slope(points):
+    """
+    Least squares slope of [(x, y)], 0 for fewer than two points
+    """
+    if len(points) < 2:
+        return 0.0
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+
+def events_applied(csync):
+    response = csync.metrics(timeout=10)
+    if not response.get("success"):
+        return None
+    return response["data"].get(f"{PCSM_METRIC_PREFIX}events_applied_total", 0)
+
+def wait_for_lag_below(csync, threshold, max_queue=0, timeout=600, interval=0.5, samples=None):
+    """
+    Returns seconds until lag_time_seconds drops to threshold and the event queue
+    to max_queue, or None if that did not happen within timeout. Scrapes are appended
+    to samples in the sample_repl_metrics format when a list is given
+    """
+    start_time = time.time()
+    while time.time() - start_time < timeout:
+        scraped_at = time.time()
+        response = csync.metrics(timeout=10)
+        if response.get("success"):
+            data = response["data"]
+            lag = data.get(f"{PCSM_METRIC_PREFIX}lag_time_seconds", 0)
+            queue = data.get(f"{PCSM_METRIC_PREFIX}repl_event_queue_size", 0)
+            if samples is not None:
+                samples.append((scraped_at - start_time, lag, queue,
+                                data.get(f"{PCSM_METRIC_PREFIX}events_applied_total", 0)))
+            if lag <= threshold and queue <= max_queue:
+                return time.time() - start_time
+        time.sleep(interval)
+    return None
+
+def wait_for_drain(csync, start_time=None, baseline=None, quiet=2.0, timeout=900, interval=0.1):
+    """
+    Follows events_applied_total, counted from baseline or the first sample, until the
+    event queue is empty and nothing was applied for `quiet` seconds. Returns seconds
+    from start_time to the first and last applied event, applied events, events per
+    second and the peak queue size
+    """
+    start_time = start_time or time.time()
+    first_applied = last_applied = None
+    base_applied = applied = baseline
+    peak_queue = 0
+    while time.time() - start_time < timeout:
+        response = csync.metrics(timeout=10)
+        now = time.time()
+        if response.get("success"):
+            data = response["data"]
+            current = data.get(f"{PCSM_METRIC_PREFIX}events_applied_total", 0)
+            queue = data.get(f"{PCSM_METRIC_PREFIX}repl_event_queue_size", 0)
+            peak_queue = max(peak_queue, queue)
+            if base_applied is None:
+                base_applied = applied = current
+            elif current != applied:
+                applied = current
+                last_applied = now
+                if first_applied is None:
+                    first_applied = now
+            if last_applied is not None and queue == 0 and now - last_applied >= quiet:
+                break
+        time.sleep(interval)
+    else:
+        Cluster.log(f"Events were still being applied after {timeout} seconds")
+    events = (applied or 0) - (base_applied or 0)
+    drain_seconds = last_applied - start_time if last_applied else None
+    return {
+        "first_event_seconds": round(first_applied - start_time, 2) if first_applied else None,
+        "drain_seconds": round(drain_seconds, 2) if drain_seconds else None,
+        "events_applied": int(events),
+        "events_per_sec": round(events / drain_seconds) if drain_seconds else None,
+        "peak_queue": int(peak_queue),
+    }
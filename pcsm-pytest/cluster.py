@@ -4,6 +4,7 @@ import docker
 import pymongo
 import json
 import copy
+import math
 import concurrent.futures
 import psutil
 from datetime import datetime
@@ -443,6 +444,82 @@ class Cluster:
             except Exception as e:
                 Cluster.log(f"Failed to reconnect {c.name}: {e}")
 
+    # returns IP address of the container in the test network
+    @staticmethod
+    def container_ip(name):
+        container = docker.from_env().containers.get(name)
+        return container.attrs["NetworkSettings"]["Networks"]["test"]["IPAddress"]
+
+    # shapes egress traffic of the containers with tc netem (delay, jitter, loss) and tbf (rate),
+    # when peers are set only traffic towards them is shaped, other links are left untouched
+    @staticmethod
+    def shape_network(names, peers=None, delay_ms=0, jitter_ms=0, rate_mbit=None, loss_percent=0):
+        for label, value in (("delay_ms", delay_ms), ("jitter_ms", jitter_ms)):
+            if value < 0 or value != int(value):
+                raise ValueError(f"{label} must be a non-negative whole number of milliseconds, got {value}")
+        delay_ms, jitter_ms = int(delay_ms), int(jitter_ms)
+        docker_client = docker.from_env()
+        peer_ips = [Cluster.container_ip(peer) for peer in peers or []]
+        netem = "netem"
+        if delay_ms:
+            netem += f" delay {delay_ms}ms"
+            if jitter_ms:
+                netem += f" {jitter_ms}ms distribution normal"
+        if loss_percent:
+            netem += f" loss {loss_percent}%"
+        # netem holds every packet for the delay, with the default 1000 packet queue a fast or
+        # long link drops packets instead of delaying them, so the queue fits rate x delay of
+        # full size packets twice over (the docker bridge is assumed at 10gbit without a rate)
+        in_flight = (rate_mbit or 10_000) * 125_000 * (delay_ms + jitter_ms) / 1000 / 1500
+        netem += f" limit {max(1000, math.ceil(in_flight * 2))}"
+        commands = []
+        if peer_ips:
+            # band 1:4 is only used by the peer filters, everything else goes to 1:1
+            commands.append("tc qdisc add dev eth0 root handle 1: prio bands 4 priomap " + " ".join(["0"] * 16))
+            commands.append(f"tc qdisc add dev eth0 parent 1:4 handle 40: {netem}")
+        else:
+            commands.append(f"tc qdisc add dev eth0 root handle 40: {netem}")
+        if rate_mbit:
+            burst = max(32 * 1024, int(rate_mbit * 125_000 / 100))
+            commands.append(f"tc qdisc add dev eth0 parent 40:1 handle 41: tbf rate {rate_mbit}mbit burst {burst} latency 500ms")
+        commands += [f"tc filter add dev eth0 parent 1:0 protocol ip prio 1 u32 match ip dst {ip}/32 flowid 1:4"
+                     for ip in peer_ips]
+        for name in names:
+            container = docker_client.containers.get(name)
+            container.exec_run("tc qdisc del dev eth0 root", privileged=True, user="root")
+            for cmd in commands:
+                exit_code, output = container.exec_run(cmd, privileged=True, user="root")
+                if exit_code != 0:
+                    raise Exception(f"Failed to shape network on {name} with '{cmd}': {output.decode(errors='replace')}")
+            Cluster.log(f"Shaped network of {name} towards {', '.join(peers) if peers else 'all hosts'}: "
+                        f"{netem}{f', rate {rate_mbit}mbit' if rate_mbit else ''}")
+
+    # removes tc shaping from the containers
+    @staticmethod
+    def reset_network(names):
+        docker_client = docker.from_env()
+        for name in names:
+            try:
+                docker_client.containers.get(name).exec_run("tc qdisc del dev eth0 root", privileged=True, user="root")
+                Cluster.log(f"Removed network shaping from {name}")
+            except docker.errors.NotFound:
+                pass
+
+    # shapes the link between all hosts of the cluster and the peers in both directions,
+    # the delay, jitter and loss are split between the two directions, an odd number of
+    # milliseconds puts the extra one on the way to the peers
+    def shape_link(self, peers, rtt_ms=0, jitter_ms=0, rate_mbit=None, loss_percent=0):
+        outbound = {"delay_ms": math.ceil(rtt_ms / 2), "jitter_ms": math.ceil(jitter_ms / 2)}
+        inbound = {"delay_ms": rtt_ms - outbound["delay_ms"], "jitter_ms": jitter_ms - outbound["jitter_ms"]}
+        Cluster.shape_network(self.all_hosts, peers=peers, rate_mbit=rate_mbit, loss_percent=loss_percent / 2,
+                              **outbound)
+        Cluster.shape_network(peers, peers=self.all_hosts, rate_mbit=rate_mbit, loss_percent=loss_percent / 2,
+                              **inbound)
+
+    # removes the shaping added by shape_link
+    def reset_link(self, peers):
+        Cluster.reset_network(self.all_hosts + list(peers))
+
     # stops mongos container
     def stop_mongos(self):
         if self.layout == "sharded":
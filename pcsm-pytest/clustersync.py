@@ -1,15 +1,32 @@
 import docker
+import http.client
 import json
 import re
+import threading
 import pymongo
 import time
 from bson.timestamp import Timestamp
 from cluster import Cluster
+from log_tailer import LogTailer
 
 # class Clustersync for creating/manipulating with single clustersync instance
 # name = the name of the container
 # src = mongodb uri for -source option
 # dst = mongodb uri for -target option
+# api_mode = "auto" (default) talks to http://<name>:9999 over the shared test network with a
+# keep-alive connection and falls back to curl inside the container, "http" or "exec" force one
+
+# PCSM listens on localhost:2242 inside the container, entrypoint.sh forwards 9999 to it
+API_PORT = 2242
+API_FORWARD_PORT = 9999
+# connection attempts that must fail while exec works before auto mode stops trying HTTP
+DIRECT_API_MAX_FAILURES = 3
+METRIC_PREFIX = "percona_clustersync_mongodb_"
+
+class _ApiUnreachable(Exception):
+    """
+    The PCSM API request was not sent, it is safe to send it another way
+    """
 
 class Clustersync:
     def __init__(self, name, src, dst, **kwargs):
@@ -18,9 +35,18 @@ class Clustersync:
         self.dst = dst
         self.src_internal = kwargs.get('src_internal')
         self.csync_image = kwargs.get('csync_image', "csync/local")
+        self.api_host = kwargs.get('api_host', name)
+        self.api_port = kwargs.get('api_port', API_FORWARD_PORT)
+        self.api_mode = kwargs.get('api_mode', "auto")
         self.cmd_stdout = ""
         self.cmd_stderr = ""
         self.last_error = None
+        self._http = threading.local()
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+        self._direct_api = self.api_mode != "exec"
+        self._direct_failures = 0
+        self.log_tailer = None
 
     @property
     def container(self):
@@ -29,6 +55,8 @@ class Clustersync:
         return container
 
     def create(self, log_level="debug", env_vars=None, extra_args=""):
+        self._stop_log_tailer()
+        self._close_api_connections()
         try:
             existing_container = self.container
             Cluster.log(f"Removing existing csync container '{self.name}'...")
@@ -50,20 +78,131 @@ class Clustersync:
             environment=env_vars if env_vars is not None else {},
             command=cmd
         )
+        self.log_tailer = LogTailer(self.name).start()
         Cluster.log("Csync process started successfully")
 
     def destroy(self):
+        self._stop_log_tailer()
+        self._close_api_connections()
         try:
             self.container.remove(force=True)
         except docker.errors.NotFound:
             pass
 
+    def _stop_log_tailer(self):
+        if self.log_tailer is not None:
+            self.log_tailer.stop()
+            self.log_tailer = None
+
+    def _close_api_connection(self):
+        conn = getattr(self._http, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._http.conn = None
+            with self._connections_lock:
+                self._connections.discard(conn)
+
+    def _close_api_connections(self):
+        # keep-alive connections of all threads, they reconnect on next use
+        with self._connections_lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            conn.close()
+        self._http = threading.local()
+
+    def _direct_request(self, method, path, body, timeout):
+        """
+        Send the request over this thread's keep-alive connection and return the response
+        text. Raises _ApiUnreachable when the request was not sent, any other error means
+        PCSM may have received it
+        """
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        if method != "GET":
+            # a POST on an idle connection the server is closing could not be retried safely
+            self._close_api_connection()
+        for _ in range(2):
+            conn = getattr(self._http, "conn", None)
+            reused = conn is not None and conn.sock is not None
+            if conn is None:
+                conn = http.client.HTTPConnection(self.api_host, self.api_port, timeout=timeout)
+                self._http.conn = conn
+                with self._connections_lock:
+                    self._connections.add(conn)
+            if conn.sock is None:
+                conn.timeout = timeout
+                try:
+                    conn.connect()
+                except OSError as e:
+                    self._close_api_connection()
+                    raise _ApiUnreachable(e) from e
+            conn.sock.settimeout(timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+            except OSError as e:
+                self._close_api_connection()
+                if reused:
+                    # the server closed the idle keep-alive connection, retry once on a new one
+                    continue
+                raise _ApiUnreachable(e) from e
+            try:
+                response = conn.getresponse()
+                return response.read().decode("utf-8", errors="replace")
+            except http.client.RemoteDisconnected:
+                self._close_api_connection()
+                if reused and method == "GET":
+                    continue
+                raise
+            except Exception:
+                self._close_api_connection()
+                raise
+        raise _ApiUnreachable(f"{method} {path}: keep-alive connection closed twice")
+
+    def _exec_request(self, method, path, body, timeout):
+        cmd = f"curl -s -m {timeout} -X {method} http://localhost:{API_PORT}{path}"
+        if body is not None:
+            cmd += f" -H 'Content-Type: application/json' -d '{body}'"
+        exec_result = self.container.exec_run(cmd)
+        return exec_result.exit_code, exec_result.output.decode("utf-8", errors="replace")
+
+    def _api_request(self, method, path, payload=None, timeout=45):
+        """
+        Call the PCSM HTTP API and return (exit_code, response_text), exit_code
+        is 0 when a response was received, same as for curl
+        """
+        body = json.dumps(payload) if payload is not None else None
+        if self._direct_api:
+            try:
+                response = self._direct_request(method, path, body, timeout)
+                self._direct_failures = 0
+                return 0, response
+            except _ApiUnreachable as e:
+                # name resolution fails when tests are started from the host, not attached to the
+                # test network, connecting fails when the container is not created yet
+                if self.api_mode == "http":
+                    return 1, str(e)
+                exit_code, response = self._exec_request(method, path, body, timeout)
+                if exit_code == 0 and response:
+                    self._direct_failures += 1
+                    if self._direct_failures >= DIRECT_API_MAX_FAILURES:
+                        Cluster.log(f"PCSM API not reachable at {self.api_host}:{self.api_port} ({e}), "
+                                    f"using docker exec for PCSM API calls")
+                        self._direct_api = False
+                return exit_code, response
+            except (OSError, http.client.HTTPException) as e:
+                # timeouts and errors after the request was sent, sending it again
+                # could e.g. start or finalize twice
+                if method != "GET":
+                    Cluster.log(f"PCSM API {method} {path} failed: {e!r}")
+                return 1, str(e)
+        return self._exec_request(method, path, body, timeout)
+
     def _wait_for_http_server(self, timeout=30):
         start_time = time.time()
         while time.time() - start_time < timeout:
             try:
-                result = self.container.exec_run("curl -s -m 2 http://localhost:2242/status -d '{}'")
-                if result.exit_code == 0:
+                exit_code, _ = self._api_request("GET", "/status", {}, timeout=2)
+                if exit_code == 0:
                     return True
             except Exception:
                 pass
@@ -85,19 +224,14 @@ class Clustersync:
                 stdout, stderr = exec_result.output
                 self.cmd_stdout = stdout.decode("utf-8", errors="replace") if stdout else ""
                 self.cmd_stderr = stderr.decode("utf-8", errors="replace") if stderr else ""
+                status_code = exec_result.exit_code
             else:
                 Cluster.log("Using API Mode")
                 if raw_args is None:
                     payload = {}
                 else:
                     payload = raw_args
-                cmd = f"curl -s -X POST http://localhost:2242/start -H 'Content-Type: application/json' -d '{json.dumps(payload)}'"
-                exec_result = self.container.exec_run(cmd, demux=True)
-                stdout, stderr = exec_result.output
-                self.cmd_stdout = stdout.decode("utf-8", errors="replace") if stdout else ""
-                self.cmd_stderr = stderr.decode("utf-8", errors="replace") if stderr else ""
-
-            status_code = exec_result.exit_code
+                status_code, self.cmd_stdout = self._api_request("POST", "/start", payload)
 
             if status_code == 0 and self.cmd_stdout:
                 try:
@@ -123,10 +257,9 @@ class Clustersync:
 
     def status(self, timeout=45):
         try:
-            exec_result = self.container.exec_run(f"curl -m {timeout} -s -X GET http://localhost:2242/status -d '{{}}'")
-            response = exec_result.output.decode("utf-8", errors="ignore").strip()
+            status_code, response = self._api_request("GET", "/status", {}, timeout=timeout)
+            response = response.strip()
             Cluster.log(response)
-            status_code = exec_result.exit_code
 
             if status_code != 0 or not response:
                 return {"success": False, "error": "Failed to execute csync status command"}
@@ -142,9 +275,8 @@ class Clustersync:
 
     def metrics(self, timeout=45):
         try:
-            exec_result = self.container.exec_run(f"curl -m {timeout} -s -X GET http://localhost:2242/metrics")
-            response = exec_result.output.decode("utf-8", errors="ignore").strip()
-            status_code = exec_result.exit_code
+            status_code, response = self._api_request("GET", "/metrics", timeout=timeout)
+            response = response.strip()
             if status_code != 0 or not response:
                 return {"success": False, "error": "Failed to execute csync metrics command"}
             metrics_data = {}
@@ -167,6 +299,7 @@ class Clustersync:
         if self.container:
             try:
                 start_log_time = int(time.time())
+                recovery_seen = self.log_tailer.match_count("recovery") if self.log_tailer else 0
                 self.container.stop()
                 if reset and self.dst:
                     try:
@@ -179,6 +312,12 @@ class Clustersync:
                     except Exception as e:
                         Cluster.log(f"Warning: Failed to reset PCSM state: {e}. Continuing with restart anyway.")
                 self.container.start()
+                if self.log_tailer:
+                    if self.log_tailer.wait_for("recovery", timeout=timeout, start=recovery_seen):
+                        Cluster.log("Csync restarted successfully")
+                        return True
+                    Cluster.log(f"Timeout exceeded {timeout} seconds while waiting for csync to start")
+                    return False
                 log_stream = self.container.logs(stream=True, follow=True, since=start_log_time)
                 start_time = time.time()
                 for line in log_stream:
@@ -198,9 +337,8 @@ class Clustersync:
 
     def pause(self):
         try:
-            exec_result = self.container.exec_run("curl -s -X POST http://localhost:2242/pause")
-            response = exec_result.output.decode("utf-8").strip()
-            status_code = exec_result.exit_code
+            status_code, response = self._api_request("POST", "/pause")
+            response = response.strip()
             if status_code == 0 and response:
                 try:
                     json_response = json.loads(response)
@@ -236,13 +374,9 @@ class Clustersync:
 
     def resume(self, from_failure=False):
         try:
-            if from_failure:
-                cmd = 'curl -s -d \'{"fromFailure": true}\' -X POST http://localhost:2242/resume'
-            else:
-                cmd = 'curl -s -X POST http://localhost:2242/resume'
-            exec_result = self.container.exec_run(cmd)
-            response = exec_result.output.decode("utf-8").strip()
-            status_code = exec_result.exit_code
+            payload = {"fromFailure": True} if from_failure else None
+            status_code, response = self._api_request("POST", "/resume", payload)
+            response = response.strip()
             if status_code == 0 and response:
                 try:
                     json_response = json.loads(response)
@@ -263,9 +397,8 @@ class Clustersync:
 
     def finalize(self, timeout=240, interval=1):
         try:
-            exec_result = self.container.exec_run("curl -s -X POST http://localhost:2242/finalize -d '{}'")
-            response = exec_result.output.decode("utf-8").strip()
-            status_code = exec_result.exit_code
+            status_code, response = self._api_request("POST", "/finalize", {})
+            response = response.strip()
 
             if status_code == 0 and response:
                 try:
@@ -313,6 +446,16 @@ class Clustersync:
         try:
             if stream:
                 return self.container.logs(stream=True, follow=True)
+            if tail is not None and self.log_tailer:
+                self.log_tailer.catch_up()
+                lines = self.log_tailer.tail()
+                complete = len(lines) == self.log_tailer.line_count
+                if filter:
+                    lines = [line for line in lines if "GET /status" not in line]
+                # the tailer keeps a bounded window, download the full log only if it is too short
+                if complete or len(lines) >= tail:
+                    last_logs = "\n".join(lines[-tail:])
+                    return last_logs if last_logs else "No logs found"
             raw_logs = self.container.logs().decode("utf-8").strip()
             lines = raw_logs.splitlines()
             if filter:
@@ -328,6 +471,10 @@ class Clustersync:
             return f"Error fetching logs: {e}"
 
     def check_csync_errors(self):
+        if self.log_tailer:
+            self.log_tailer.catch_up()
+            errors_found = [match.string for match in self.log_tailer.get_matches("error")]
+            return not bool(errors_found), errors_found
         try:
             logs = self.container.logs().decode("utf-8")
 
@@ -346,11 +493,37 @@ class Clustersync:
         errors_found = list(error_lines())
         return not bool(errors_found), errors_found
 
+    def _source_marker(self, src_client):
+        """
+        Append a no-op oplog note on the source and return its operationTime,
+        every write acknowledged before the call has a lower or equal timestamp
+        """
+        try:
+            result = src_client.admin.command("appendOplogNote", data={"pcsm-pytest": "lag marker"})
+        except pymongo.errors.OperationFailure:
+            result = src_client.admin.command("ping")
+        return result.get("operationTime") or result.get("$clusterTime", {}).get("clusterTime")
+
+    def _repl_backlog(self):
+        metrics_response = self.metrics(timeout=5)
+        if not metrics_response.get("success"):
+            return None, None
+        data = metrics_response["data"]
+        return (data.get(f"{METRIC_PREFIX}lag_time_seconds"),
+                data.get(f"{METRIC_PREFIX}repl_event_queue_size"))
+
     def wait_for_zero_lag(self, timeout=240, interval=1):
+        # Sync is reached once the last replicated op reaches a marker written on the source
+        # after all preceding writes, with an empty event queue. If the marker is never reported
+        # as replicated, the previous rule applies: within 2s of the marker with event counters
+        # unchanged for 5 polls spanning at least 5 intervals (and an empty queue with /metrics).
+        # Polls start 50ms apart and back off exponentially up to `interval`.
         start_time = time.time()
         last_events_read = None
         last_events_applied = None
         stability_counter = 0
+        stable_since = None
+        delay = 0.05
         self.last_error = None
 
         try:
@@ -360,20 +533,18 @@ class Clustersync:
             Cluster.log(f"Error: {self.last_error}")
             return False
 
-        while time.time() - start_time < timeout:
-            try:
-                ping_result = src_client.admin.command("ping")
-                cluster_time = ping_result.get("$clusterTime", {}).get("clusterTime")
-
-                if cluster_time is None:
-                    self.last_error = "Failed to get clusterTime from source"
-                    Cluster.log(f"Error: {self.last_error}")
-                    return False
-            except Exception as e:
-                self.last_error = f"Failed to retrieve clusterTime from source: {e}"
+        try:
+            marker_ts = self._source_marker(src_client)
+            if marker_ts is None:
+                self.last_error = "Failed to get clusterTime from source"
                 Cluster.log(f"Error: {self.last_error}")
                 return False
+        except Exception as e:
+            self.last_error = f"Failed to retrieve clusterTime from source: {e}"
+            Cluster.log(f"Error: {self.last_error}")
+            return False
 
+        while time.time() - start_time < timeout:
             status_response = self.status()
             if not status_response.get("success"):
                 self.last_error = status_response.get("error", "Failed to retrieve status")
@@ -406,24 +577,42 @@ class Clustersync:
                 Cluster.log(f"Error: {self.last_error}")
                 return False
 
+            lag_time, queue_size = self._repl_backlog()
+            queue_empty = queue_size is not None and queue_size == 0
+
             events_stable = (last_events_read is not None and last_events_applied is not None and
                            current_events_read == last_events_read and
                            current_events_applied == last_events_applied)
+            now = time.time()
             if events_stable:
                 stability_counter += 1
             else:
                 stability_counter = 0
-            is_caught_up = cluster_time.time <= last_ts.time + 2
+                stable_since = now
+            is_caught_up = marker_ts.time <= last_ts.time + 2
 
-            if is_caught_up and events_stable and stability_counter >= 5:
-                lag_info = "0 lag" if last_ts >= cluster_time else "1-2s lag"
-                Cluster.log(f"Src and dst are in sync ({lag_info}): last repl TS {last_ts} >= cluster time {cluster_time}, "
+            if last_ts >= marker_ts:
+                in_sync = queue_empty or queue_size is None
+            else:
+                in_sync = (is_caught_up and events_stable and stability_counter >= 5 and
+                           now - stable_since >= 5 * interval and (queue_empty or queue_size is None))
+
+            if in_sync:
+                lag_info = "0 lag" if last_ts >= marker_ts else "1-2s lag"
+                Cluster.log(f"Src and dst are in sync ({lag_info}): last repl TS {last_ts}, marker TS {marker_ts}, "
                           f"eventsRead={current_events_read}, eventsApplied={current_events_applied}, "
-                          f"stability={stability_counter} checks")
+                          f"lagTimeSeconds={lag_time}, queueSize={queue_size}, "
+                          f"waited {now - start_time:.2f}s")
                 return True
             last_events_read = current_events_read
             last_events_applied = current_events_applied
-            time.sleep(interval)
+
+            # poll quickly again while the queue is drained and lag is small, back off otherwise
+            if queue_empty and lag_time is not None and lag_time <= 2 and not events_stable:
+                delay = 0.05
+            else:
+                delay = min(delay * 2, interval)
+            time.sleep(delay)
 
         self.last_error = "Timeout reached while waiting for replication to catch up"
         Cluster.log(f"Error: {self.last_error}")
@@ -0,0 +1,138 @@
+import concurrent.futures
+import pymongo
+
+from cluster import Cluster
+from clustersync import Clustersync
+
+# Runs several PCSM instances side by side, each replicating a disjoint includeNamespaces
+# partition of the source, and exposes them through the Clustersync interface used by tests.
+# All members write their sync state to the same target, check shared_state_conflict()
+# before trusting their results
+
+STATE_DB = "percona_clustersync_mongodb"
+SYSTEM_DBS = ("admin", "local", "config", STATE_DB)
+
+def collection_sizes(connection_string, databases=None):
+    """
+    Returns {namespace: data size in bytes} for user collections on the source,
+    sizes are summed over shards for sharded clusters
+    """
+    client = pymongo.MongoClient(connection_string)
+    sizes = {}
+    for db_name in databases or client.list_database_names():
+        if db_name in SYSTEM_DBS:
+            continue
+        db = client[db_name]
+        for info in db.list_collections(filter={"type": "collection"}):
+            coll_name = info["name"]
+            if coll_name.startswith("system."):
+                continue
+            size = 0
+            for stats in db[coll_name].aggregate([{"$collStats": {"storageStats": {}}}]):
+                size += stats.get("storageStats", {}).get("size", 0)
+            sizes[f"{db_name}.{coll_name}"] = size
+    return sizes
+
+def plan_namespace_partitions(connection_string, num_partitions, databases=None):
+    """
+    Splits source collections into num_partitions lists of namespaces with
+    balanced total size, largest collections are placed first
+    """
+    sizes = collection_sizes(connection_string, databases)
+    partitions = [{"namespaces": [], "size": 0} for _ in range(num_partitions)]
+    for namespace, size in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        target = min(partitions, key=lambda partition: partition["size"])
+        target["namespaces"].append(namespace)
+        target["size"] += size
+    for i, partition in enumerate(partitions):
+        Cluster.log(f"Partition {i}: {len(partition['namespaces'])} namespaces, "
+                    f"{partition['size'] / (1024 * 1024):.1f} MB")
+    return [sorted(partition["namespaces"]) for partition in partitions if partition["namespaces"]]
+
+class ClustersyncGroup:
+    def __init__(self, name, src, dst, partitions, **kwargs):
+        self.partitions = partitions
+        self.members = [Clustersync(f"{name}{i}", src, dst, **kwargs) for i in range(len(partitions))]
+
+    def _run(self, func):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(self.members)) as executor:
+            return list(executor.map(func, self.members))
+
+    def create(self, log_level="info", env_vars=None, extra_args=""):
+        self._run(lambda member: member.create(log_level=log_level, env_vars=env_vars, extra_args=extra_args))
+
+    def destroy(self):
+        self._run(lambda member: member.destroy())
+
+    def start(self, raw_args=None):
+        def start_member(args):
+            member, namespaces = args
+            return member.start(raw_args={**(raw_args or {}), "includeNamespaces": namespaces})
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(self.members)) as executor:
+            return all(executor.map(start_member, zip(self.members, self.partitions)))
+
+    def status(self, timeout=45):
+        """
+        Combines member statuses into one: counters and clone sizes are summed,
+        lag is the maximum and flags are true only if true for every member
+        """
+        responses = self._run(lambda member: member.status(timeout=timeout))
+        failed = [r.get("error", "Unknown error") for r in responses if not r.get("success")]
+        if failed:
+            return {"success": False, "error": "; ".join(failed)}
+        members = [r["data"] for r in responses]
+        initial_syncs = [data.get("initialSync") or {} for data in members]
+        errors = [data.get("error") for data in members if data.get("error")]
+        states = {data.get("state") for data in members}
+        data = {
+            "ok": all(data.get("ok") for data in members),
+            "state": states.pop() if len(states) == 1 else "mixed",
+            "eventsRead": sum(data.get("eventsRead") or 0 for data in members),
+            "eventsApplied": sum(data.get("eventsApplied") or 0 for data in members),
+            "lagTimeSeconds": max(data.get("lagTimeSeconds") or 0 for data in members),
+            "initialSync": {
+                "cloneCompleted": all(s.get("cloneCompleted") for s in initial_syncs),
+                "completed": all(s.get("completed") for s in initial_syncs),
+                "clonedSizeBytes": sum(s.get("clonedSizeBytes") or 0 for s in initial_syncs),
+                "estimatedCloneSizeBytes": sum(s.get("estimatedCloneSizeBytes") or 0 for s in initial_syncs),
+            },
+            "members": members,
+        }
+        if errors:
+            data["error"] = "; ".join(errors)
+        return {"success": True, "data": data}
+
+    def shared_state_conflict(self):
+        """
+        Returns why the members cannot sync side by side, or None. PCSM keeps its checkpoint
+        and heartbeat in STATE_DB on the target, members sharing one document overwrite each
+        other's checkpoints or are refused by the heartbeat check
+        """
+        for member in self.members:
+            container = member.container
+            if container.status != "running":
+                return f"{member.name} is {container.status} after start"
+            member.log_tailer.catch_up()
+            matches = member.log_tailer.get_matches("heartbeat")
+            if matches:
+                return f"{member.name} logged a heartbeat conflict: {matches[-1].string.strip()}"
+        state = pymongo.MongoClient(self.members[0].dst)[STATE_DB]
+        heartbeats = state.heartbeats.count_documents({})
+        if heartbeats < len(self.members):
+            return (f"{len(self.members)} PCSM instances share {heartbeats} heartbeat document(s) in "
+                    f"{STATE_DB} on the target, concurrent instances need separate sync state")
+        return None
+
+    def wait_for_repl_stage(self, timeout=60):
+        return all(self._run(lambda member: member.wait_for_repl_stage(timeout=timeout)))
+
+    def wait_for_zero_lag(self, timeout=240):
+        return all(self._run(lambda member: member.wait_for_zero_lag(timeout=timeout)))
+
+    def finalize(self, timeout=240):
+        return all(self._run(lambda member: member.finalize(timeout=timeout)))
+
+    def check_csync_errors(self):
+        results = self._run(lambda member: member.check_csync_errors())
+        errors = [f"{member.name}: {line}" for member, (_, lines) in zip(self.members, results) for line in lines]
+        return not errors, errors
@@ -4,17 +4,27 @@ import docker
 
 from cluster import Cluster
 from clustersync import Clustersync
+from loadgen_metrics import start_metrics_server
 
 pytest_plugins = ["metrics_collector"]
 
 def pytest_addoption(parser):
     parser.addoption("--jenkins", action="store_true", default=False, help="Run tests marked as jenkins")
+    parser.addoption("--benchmark", action="store_true", default=False, help="Run tests marked as benchmark")
+    parser.addoption("--loadgen-metrics-port", type=int, default=0,
+                     help="Expose client-side load generator metrics for Prometheus on this port")
+
+def pytest_configure(config):
+    port = config.getoption("--loadgen-metrics-port", default=0)
+    if port:
+        start_metrics_server(port)
 
 def pytest_collection_modifyitems(config, items):
-    if config.getoption("--jenkins", default=False):
-        return
-    items[:] = [item for item in items
-                if item.get_closest_marker("jenkins") is None and "jenkins" not in item.keywords]
+    for marker in ("jenkins", "benchmark"):
+        if config.getoption(f"--{marker}", default=False):
+            continue
+        items[:] = [item for item in items
+                    if item.get_closest_marker(marker) is None and marker not in item.keywords]
 
 def cleanup_all_test_containers():
     """
@@ -37,6 +47,9 @@ def cleanup_all_test_containers():
     except Exception as e:
         Cluster.log(f"Warning: Error during test container cleanup: {e}")
 
+# every setup type get_cluster_config knows, for tests parametrized over all topologies
+SETUP_TYPES = ["replicaset", "replicaset_3n", "sharded", "sharded_3n", "rs_sharded", "sharded_rs"]
+
 def get_cluster_config(setup_type):
     """
     Returns configuration for the given setup type
@@ -114,7 +127,7 @@ def get_cluster_config(setup_type):
             "dst_config": {"_id": "rs3", "members": [{"host": "rs301"}]}
         }
     else:
-        raise ValueError(f"Unknown setup type: {setup_type}")
+        raise ValueError(f"Unknown setup type: {setup_type}, expected one of {', '.join(SETUP_TYPES)}")
 
 @pytest.fixture(scope="function")
 def cluster_configs(request):
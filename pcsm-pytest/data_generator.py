@@ -1,9 +1,10 @@
 import pymongo
 import threading
 import time
-from bson import ObjectId
+from bson import ObjectId, BSON
 
 from cluster import Cluster
+from loadgen_metrics import load_metrics
 from data_types.basic_collection_types import create_collection_types, perform_crud_ops_collection
 from data_types.index_types import create_index_types
 from data_types.extended_collection_types import create_diff_coll_types
@@ -90,6 +91,15 @@ def stop_all_crud_operations():
     for db_name, stop_event in stop_operations_map.items():
         stop_event.set()
 
+def timed_insert_many(collection, docs, doc_size):
+    start = time.perf_counter()
+    try:
+        collection.insert_many(docs, ordered=False, bypass_document_validation=True)
+    except Exception:
+        load_metrics.record_error("insert")
+        raise
+    load_metrics.record("insert", len(docs), len(docs) * doc_size, time.perf_counter() - start)
+
 def generate_dummy_data(connection_string, db_name="dummy", num_collections=5, doc_size=150000,
                         batch_size=10000, stop_event=None, sleep_between_batches=0, drop_before_creation=True,
                         is_sharded=False, is_unique_index=False):
@@ -126,13 +136,14 @@ def generate_dummy_data(connection_string, db_name="dummy", num_collections=5, d
             for batch_start in range(0, doc_size, batch_size):
                 docs = [{"unique_field": batch_start + j, "data": "x" * 200}
                         for j in range(min(batch_size, doc_size - batch_start))]
-                coll.insert_many(docs, ordered=False, bypass_document_validation=True)
+                timed_insert_many(coll, docs, len(BSON.encode(docs[0])))
 
             coll.create_index([("unique_field", pymongo.ASCENDING)], unique=True, name="unique_idx")
 
             if is_sharded:
                 client.admin.command("shardCollection", f"{db_name}.coll_{i}", key={"unique_field": 1})
     else:
+        encoded_size = len(BSON.encode({**template_doc, "_id": ObjectId()}))
         for coll_name in collections:
             if stop_event and stop_event.is_set():
                 break
@@ -145,7 +156,7 @@ def generate_dummy_data(connection_string, db_name="dummy", num_collections=5, d
                 if stop_event and stop_event.is_set():
                     break
                 docs = [{**template_doc, "_id": ObjectId()} for _ in range(batch_size)]
-                collection.insert_many(docs, ordered=False, bypass_document_validation=True)
+                timed_insert_many(collection, docs, encoded_size)
                 if sleep_between_batches > 0:
                     time.sleep(sleep_between_batches)
     Cluster.log("Dummy data generation is completed")
\ No newline at end of file
@@ -1,5 +1,68 @@
 import pymongo
 import datetime
+from pymongo import IndexModel
+
+# Index shapes per collection, also applied to a large collection by test_bench_index_finalization.py
+INDEX_TYPES = {
+    "geo_indexes": [
+        IndexModel([("location_2d", pymongo.GEO2D)], name="2d_index", min=-180, max=180, bits=32),
+        IndexModel([("location_2dsphere", pymongo.GEOSPHERE)], name="2dsphere_index"),
+    ],
+    "hashed_indexes": [
+        IndexModel([("hashed_field", pymongo.HASHED)], name="hashed_basic_index"),
+        IndexModel([("hashed_field", pymongo.HASHED)], name="hashed_partial_index",
+                   partialFilterExpression={"secondary_field": {"$exists": True}}),
+        IndexModel([("hashed_field", pymongo.HASHED)], name="hashed_sparse_index", sparse=True),
+        IndexModel([("hashed_field", pymongo.HASHED), ("secondary_field", pymongo.ASCENDING)],
+                   name="hashed_compound_index"),
+    ],
+    "ttl_indexes": [
+        IndexModel([("created_at", pymongo.ASCENDING)], name="ttl_index", expireAfterSeconds=3600),
+        IndexModel([("created_at", pymongo.ASCENDING)], name="ttl_partial_index",
+                   expireAfterSeconds=7200, partialFilterExpression={"short_lived": True}),
+    ],
+    "partial_indexes": [
+        IndexModel([("partial_field", pymongo.ASCENDING)], name="partial_index",
+                   partialFilterExpression={"partial_field": {"$exists": True}}),
+    ],
+    "text_indexes": [
+        IndexModel([("content", pymongo.TEXT)], name="regular_text_index", unique=True),
+    ],
+    "regular_text_indexes": [
+        IndexModel([("title", pymongo.TEXT), ("description", pymongo.TEXT)],
+                   name="regular_text_index_with_weights",
+                   weights={"title": 5, "description": 1},
+                   default_language="english",
+                   language_override="lang",
+                   textIndexVersion=3),
+    ],
+    "wildcard_text_indexes": [
+        IndexModel([("$**", pymongo.TEXT)], name="wildcard_text_index"),
+    ],
+    "wildcard_indexes": [
+        IndexModel([("$**", pymongo.ASCENDING)], name="wildcard_index"),
+        IndexModel([("$**", pymongo.ASCENDING)], name="filtered_wildcard_index",
+                   partialFilterExpression={"extra_field": {"$exists": True}}),
+        IndexModel([("$**", pymongo.ASCENDING)], name="wildcard_projection_index",
+                   wildcardProjection={"field1": 1, "nested.subfield": 1}),
+    ],
+    "multi_key_indexes": [
+        IndexModel([("tags", pymongo.ASCENDING)], name="multi_key_index"),
+    ],
+    "compound_indexes": [
+        IndexModel([("first_name", pymongo.ASCENDING), ("last_name", pymongo.ASCENDING)],
+                   name="compound_unique_index", unique=True),
+        IndexModel([("first_name", pymongo.ASCENDING), ("last_name", pymongo.ASCENDING)],
+                   name="compound_collation_index", collation=pymongo.collation.Collation(locale="en", strength=2)),
+        IndexModel([("first_name", pymongo.ASCENDING), ("last_name", pymongo.ASCENDING)],
+                   name="compound_partial_index", partialFilterExpression={"age": {"$gt": 20}}),
+        IndexModel([("first_name", pymongo.ASCENDING), ("last_name", pymongo.ASCENDING)],
+                   name="compound_sparse_index", sparse=True),
+    ],
+    "hidden_indexes": [
+        IndexModel([("data", pymongo.ASCENDING)], name="hidden_index", hidden=True),
+    ],
+}
 
 def create_index_types(db, drop_before_creation=False):
     collections = [
@@ -20,21 +83,14 @@ def create_index_types(db, drop_before_creation=False):
         {"location_2d": [-122.4194, 37.7749]},
         {"location_2dsphere": {"type": "Point", "coordinates": [-74.0060, 40.7128]}},
     ])
-
-    geo_collection.create_index([("location_2d", pymongo.GEO2D)], name="2d_index", min=-180, max=180, bits=32)
-    geo_collection.create_index([("location_2dsphere", pymongo.GEOSPHERE)], name="2dsphere_index")
+    geo_collection.create_indexes(INDEX_TYPES["geo_indexes"])
 
     # Hashed Index Variants
     hashed_collection = db.hashed_indexes
     hashed_collection.insert_many([
         {"hashed_field": f"user_{i}", "secondary_field": f"extra_{i}"} for i in range(10)
     ])
-    hashed_collection.create_index([("hashed_field", pymongo.HASHED)], name="hashed_basic_index")
-    hashed_collection.create_index([("hashed_field", pymongo.HASHED)], name="hashed_partial_index",
-                                   partialFilterExpression={"secondary_field": {"$exists": True}})
-    hashed_collection.create_index([("hashed_field", pymongo.HASHED)], name="hashed_sparse_index", sparse=True)
-    hashed_collection.create_index([("hashed_field", pymongo.HASHED), ("secondary_field", pymongo.ASCENDING)],
-                                   name="hashed_compound_index")
+    hashed_collection.create_indexes(INDEX_TYPES["hashed_indexes"])
 
     # TTL Index Variants
     ttl_collection = db.ttl_indexes
@@ -42,9 +98,7 @@ def create_index_types(db, drop_before_creation=False):
         {"created_at": datetime.datetime.now(datetime.timezone.utc), "short_lived": True},
         {"created_at": datetime.datetime.now(datetime.timezone.utc), "long_lived": True}
     ])
-    ttl_collection.create_index([("created_at", pymongo.ASCENDING)], name="ttl_index", expireAfterSeconds=3600)
-    ttl_collection.create_index([("created_at", pymongo.ASCENDING)], name="ttl_partial_index",
-                                expireAfterSeconds=7200, partialFilterExpression={"short_lived": True})
+    ttl_collection.create_indexes(INDEX_TYPES["ttl_indexes"])
 
     # Partial Index
     partial_collection = db.partial_indexes
@@ -52,11 +106,7 @@ def create_index_types(db, drop_before_creation=False):
         {"partial_field": "indexed"},
         {"non_partial_field": "not indexed"}
     ])
-    partial_collection.create_index(
-        [("partial_field", pymongo.ASCENDING)],
-        name="partial_index",
-        partialFilterExpression={"partial_field": {"$exists": True}}
-    )
+    partial_collection.create_indexes(INDEX_TYPES["partial_indexes"])
 
     # Regular Text Index
     text_collection = db.text_indexes
@@ -64,7 +114,7 @@ def create_index_types(db, drop_before_creation=False):
         {"content": "Hello MongoDB", "extra": "Some extra data"},
         {"content": "Pytest integration testing", "extra": "Another document"}
     ])
-    text_collection.create_index([("content", pymongo.TEXT)], name="regular_text_index", unique=True)
+    text_collection.create_indexes(INDEX_TYPES["text_indexes"])
 
     # Regular Text Index with Weights
     regular_text_collection = db.regular_text_indexes
@@ -72,14 +122,7 @@ def create_index_types(db, drop_before_creation=False):
         {"title": "MongoDB Basics", "description": "A guide to MongoDB indexes"},
         {"title": "Advanced MongoDB", "description": "Deep dive into text search"}
     ])
-    regular_text_collection.create_index(
-        [("title", pymongo.TEXT), ("description", pymongo.TEXT)],
-        name="regular_text_index_with_weights",
-        weights={"title": 5, "description": 1},
-        default_language="english",
-        language_override="lang",
-        textIndexVersion=3
-    )
+    regular_text_collection.create_indexes(INDEX_TYPES["regular_text_indexes"])
 
     # Wildcard Text Index
     wildcard_text_collection = db.wildcard_text_indexes
@@ -88,10 +131,7 @@ def create_index_types(db, drop_before_creation=False):
         {"random_field": "This should also be searchable"},
         {"nested": {"field": "Wildcard indexing applies here too"}}
     ])
-    wildcard_text_collection.create_index(
-        [("$**", pymongo.TEXT)],
-        name="wildcard_text_index"
-    )
+    wildcard_text_collection.create_indexes(INDEX_TYPES["wildcard_text_indexes"])
 
     # Wildcard Index Variations
     wildcard_collection = db.wildcard_indexes
@@ -99,13 +139,7 @@ def create_index_types(db, drop_before_creation=False):
         {"field1": "value1", "field2": "value2", "nested": {"subfield": "nested_value"}},
         {"field1": "another_value", "extra_field": "extra_data"}
     ])
-    wildcard_collection.create_index([("$**", pymongo.ASCENDING)], name="wildcard_index")
-    wildcard_collection.create_index(
-        [("$**", pymongo.ASCENDING)], name="filtered_wildcard_index",
-        partialFilterExpression={"extra_field": {"$exists": True}})
-    wildcard_collection.create_index(
-        [("$**", pymongo.ASCENDING)], name="wildcard_projection_index",
-        wildcardProjection={"field1": 1, "nested.subfield": 1})
+    wildcard_collection.create_indexes(INDEX_TYPES["wildcard_indexes"])
 
     # Multi-key Index
     multi_key_collection = db.multi_key_indexes
@@ -114,7 +148,7 @@ def create_index_types(db, drop_before_creation=False):
         {"tags": ["pytest", "testing"]},
         {"tags": ["performance", "optimization"]}
     ])
-    multi_key_collection.create_index([("tags", pymongo.ASCENDING)], name="multi_key_index")
+    multi_key_collection.create_indexes(INDEX_TYPES["multi_key_indexes"])
 
     # Clustered Index (MongoDB 5.3+)
     db.create_collection(
@@ -133,18 +167,7 @@ def create_index_types(db, drop_before_creation=False):
         {"first_name": "Alice", "last_name": "Smith", "age": 30},
         {"first_name": "Bob", "last_name": "Brown", "age": 25}
     ])
-    compound_collection.create_index([("first_name", pymongo.ASCENDING), ("last_name", pymongo.ASCENDING)],
-                                     name="compound_unique_index", unique=True
-    )
-    compound_collection.create_index( [("first_name", pymongo.ASCENDING), ("last_name", pymongo.ASCENDING)],
-                                     name="compound_collation_index", collation=pymongo.collation.Collation(locale="en", strength=2)
-    )
-    compound_collection.create_index( [("first_name", pymongo.ASCENDING), ("last_name", pymongo.ASCENDING)],
-                                     name="compound_partial_index", partialFilterExpression={"age": {"$gt": 20}}
-    )
-    compound_collection.create_index([("first_name", pymongo.ASCENDING), ("last_name", pymongo.ASCENDING)],
-                                     name="compound_sparse_index", sparse=True
-    )
+    compound_collection.create_indexes(INDEX_TYPES["compound_indexes"])
 
     # Hidden Index
     hidden_collection = db.hidden_indexes
@@ -152,6 +175,4 @@ def create_index_types(db, drop_before_creation=False):
         {"data": "example1"},
         {"data": "example2"}
     ])
-    hidden_collection.create_index(
-        [("data", pymongo.ASCENDING)], name="hidden_index", hidden=True
-    )
\ No newline at end of file
+    hidden_collection.create_indexes(INDEX_TYPES["hidden_indexes"])
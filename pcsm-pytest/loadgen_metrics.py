@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cluster import Cluster
+
+# Client-side view of the load generated by the harness (generate_dummy_data), exposed in
+# Prometheus text format so it can be scraped next to PCSM's own /metrics
+
+METRICS_PREFIX = "pcsm_loadgen_"
+QUANTILES = (0.5, 0.95, 0.99, 0.999)
+# (metric name, stats key, help), the same families scripts/test_pcsm_iops.py exposes
+COUNTERS = [
+    ("documents_total", "documents", "Documents written per operation type"),
+    ("bytes_written_total", "bytes", "Encoded document bytes written per operation type"),
+    ("errors_total", "errors", "Failed operations per type"),
+]
+
+class LoadMetrics:
+    # rate and latency quantiles are computed over the last `window` seconds, like the report
+    # interval of scripts/test_pcsm_iops.py and the standalone copy in pcsm-functional/scripts/load_data.py
+    def __init__(self, window=10):
+        self.lock = threading.Lock()
+        self.window = window
+        self.ops = {}
+
+    def _op(self, op):
+        stats = self.ops.get(op)
+        if stats is None:
+            stats = self.ops[op] = {"documents": 0, "bytes": 0, "errors": 0, "count": 0, "latency_sum": 0.0,
+                                    "samples": deque()}
+        return stats
+
+    def record(self, op, docs, nbytes, latency):
+        now = time.time()
+        with self.lock:
+            stats = self._op(op)
+            stats["documents"] += docs
+            stats["bytes"] += nbytes
+            stats["count"] += 1
+            stats["latency_sum"] += latency
+            stats["samples"].append((now, stats["documents"], latency))
+            while stats["samples"] and stats["samples"][0][0] < now - self.window:
+                stats["samples"].popleft()
+
+    def record_error(self, op):
+        with self.lock:
+            self._op(op)["errors"] += 1
+
+    def render(self):
+        with self.lock:
+            snapshot = {op: dict(stats, latencies=sorted(latency for _, _, latency in stats["samples"]),
+                                 samples=list(stats["samples"]))
+                        for op, stats in self.ops.items()}
+        lines = []
+        for name, key, help_text in COUNTERS:
+            lines.append(f"# HELP {METRICS_PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {METRICS_PREFIX}{name} counter")
+            lines += [f'{METRICS_PREFIX}{name}{{op="{op}"}} {stats[key]}' for op, stats in sorted(snapshot.items())]
+        # documents, not insert_many calls, so the rate matches scripts/test_pcsm_iops.py
+        lines.append(f"# HELP {METRICS_PREFIX}ops_per_second Documents per second over the last {self.window}s")
+        lines.append(f"# TYPE {METRICS_PREFIX}ops_per_second gauge")
+        for op, stats in sorted(snapshot.items()):
+            samples = stats["samples"]
+            rate = 0.0
+            if len(samples) > 1 and samples[-1][0] > samples[0][0]:
+                rate = (samples[-1][1] - samples[0][1]) / (samples[-1][0] - samples[0][0])
+            lines.append(f'{METRICS_PREFIX}ops_per_second{{op="{op}"}} {rate:.3f}')
+        lines.append(f"# HELP {METRICS_PREFIX}latency_seconds "
+                     f"Operation latency, quantiles over the last {self.window}s")
+        lines.append(f"# TYPE {METRICS_PREFIX}latency_seconds summary")
+        for op, stats in sorted(snapshot.items()):
+            latencies = stats["latencies"]
+            for q in QUANTILES:
+                value = latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0
+                lines.append(f'{METRICS_PREFIX}latency_seconds{{op="{op}",quantile="{q:g}"}} {value:.6f}')
+            lines.append(f'{METRICS_PREFIX}latency_seconds_sum{{op="{op}"}} {stats["latency_sum"]:.6f}')
+            lines.append(f'{METRICS_PREFIX}latency_seconds_count{{op="{op}"}} {stats["count"]}')
+        return "\n".join(lines) + "\n"
+
+load_metrics = LoadMetrics()
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = load_metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port):
+    """
+    Serve load generator metrics on the given port, the bundled Prometheus
+    scrapes test:9400 when started with the monitoring profile
+    """
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    Cluster.log(f"Serving load generator metrics on port {port}")
+    return server
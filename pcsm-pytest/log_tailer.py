@@ -0,0 +1,179 @@
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import docker
+
+# Follows a container's log stream once in the background and matches every new line
+# against a registry of precompiled patterns, so callers query matches instead of
+# downloading and re-scanning the whole log
+
+ANSI_ESCAPE_RE = re.compile(r"\x1b\[[0-9;]*m")
+
+DEFAULT_PATTERNS = {
+    "error": r"\b(?:ERROR|ERR|error|err)\b",
+    "recovery": r"Checking Recovery Data",
+    "segmenter": r"Segmenter for (\S+):.*?segments:\s*~(\d+)",
+    # URI options PCSM removes from --source/--target, logged right after the process starts
+    "stripped_option": r'Connection string option "(\w+)" is not allowed',
+    # another PCSM instance already holds the target's heartbeat
+    "heartbeat": r"(?i)heartbeat.*\b(?:error|failed|exists|another|already)\b",
+}
+
+def _parse_timestamp(ts):
+    # docker uses RFC3339 with fixed nanoseconds, e.g. 2025-01-01T10:00:00.123456789Z
+    return datetime.strptime(ts[:26], "%Y-%m-%dT%H:%M:%S.%f").replace(tzinfo=timezone.utc).timestamp()
+
+class LogTailer:
+    def __init__(self, container_name, patterns=None, tail_lines=10000):
+        self.container_name = container_name
+        self.patterns = {}
+        self.matches = {}
+        self.lines = deque(maxlen=tail_lines)
+        self.offset = 0
+        self.line_count = 0
+        self.last_timestamp = None
+        self.last_activity = time.time()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._stream = None
+        self._thread = None
+        for name, pattern in (patterns or DEFAULT_PATTERNS).items():
+            self.register(name, pattern)
+
+    def register(self, name, pattern):
+        """
+        Adds a pattern to the registry, only lines received after
+        registration are matched against it
+        """
+        with self._cond:
+            self.patterns[name] = re.compile(pattern) if isinstance(pattern, str) else pattern
+            self.matches.setdefault(name, [])
+
+    def start(self):
+        self._thread = threading.Thread(target=self._follow, name=f"log-tailer-{self.container_name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        stream = self._stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _follow(self):
+        client = docker.from_env()
+        buffer = b""
+        while not self._stop.is_set():
+            since = None
+            if self.last_timestamp is not None:
+                since = int(_parse_timestamp(self.last_timestamp))
+            try:
+                container = client.containers.get(self.container_name)
+                self._stream = container.logs(stream=True, follow=True, timestamps=True, since=since)
+                for chunk in self._stream:
+                    buffer += chunk
+                    *complete, buffer = buffer.split(b"\n")
+                    for raw_line in complete:
+                        self._process(raw_line)
+                    if self._stop.is_set():
+                        break
+            except docker.errors.NotFound:
+                pass
+            except Exception:
+                if self._stop.is_set():
+                    break
+            finally:
+                self._stream = None
+            # stream ends when the container stops, reattach after it is started again
+            buffer = b""
+            self._stop.wait(0.2)
+
+    def _process(self, raw_line):
+        ts, _, text = raw_line.decode("utf-8", errors="replace").partition(" ")
+        # lines repeated after reattaching with a whole-second 'since'
+        if self.last_timestamp is not None and ts <= self.last_timestamp:
+            return
+        line = ANSI_ESCAPE_RE.sub("", text).rstrip("\r")
+        found = [(name, match) for name, pattern in self.patterns.items()
+                 if (match := pattern.search(line)) is not None]
+        with self._cond:
+            self.last_timestamp = ts
+            self.last_activity = time.time()
+            self.offset += len(raw_line) + 1
+            self.line_count += 1
+            self.lines.append(line)
+            for name, match in found:
+                self.matches[name].append(match)
+            self._cond.notify_all()
+
+    def get_matches(self, name, start=0):
+        with self._cond:
+            return list(self.matches[name][start:])
+
+    def match_count(self, name):
+        with self._cond:
+            return len(self.matches[name])
+
+    def wait_for(self, name, timeout=60, start=0):
+        """
+        Returns the first match of the pattern with index >= start,
+        or None when it does not appear within timeout
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while len(self.matches[name]) <= start:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return self.matches[name][start]
+
+    def catch_up(self, timeout=5, idle=0.3):
+        """
+        Waits until lines written before the call are processed, i.e. a line with a
+        later timestamp was received or the stream has been idle for `idle` seconds
+        """
+        target = time.time()
+        deadline = target + timeout
+        with self._cond:
+            while time.time() < deadline:
+                if self.last_timestamp is not None and _parse_timestamp(self.last_timestamp) >= target:
+                    return True
+                if time.time() - self.last_activity >= idle and time.time() - target >= idle:
+                    return True
+                self._cond.wait(idle / 3)
+        return False
+
+    def settle(self, quiet=1.0, timeout=60, ignore=None):
+        """
+        Waits until no new lines, other than ones matching `ignore`,
+        were logged for `quiet` seconds
+        """
+        ignore_re = re.compile(ignore) if isinstance(ignore, str) else ignore
+        deadline = time.time() + timeout
+        with self._cond:
+            seen = self.line_count
+            quiet_since = time.time()
+            while time.time() < deadline:
+                if self.line_count != seen:
+                    new_lines = list(self.lines)[-min(self.line_count - seen, len(self.lines)):]
+                    seen = self.line_count
+                    if ignore_re is None or not all(ignore_re.search(line) for line in new_lines):
+                        quiet_since = time.time()
+                if time.time() - quiet_since >= quiet:
+                    return True
+                self._cond.wait(min(quiet / 3, max(deadline - time.time(), 0)))
+        return False
+
+    def tail(self, n=None):
+        with self._cond:
+            lines = list(self.lines)
+        return lines if n is None else lines[-n:]
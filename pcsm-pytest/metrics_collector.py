@@ -83,3 +83,103 @@ def metrics_collector(request):
     Cluster.log(metrics_data)
     Cluster.log("Stop collecting metrics")
     plot_metrics(metrics_data, request.node.name)
+
+PCSM_METRIC_PREFIX = "percona_clustersync_mongodb_"
+
+# counter -> name of the derived per-second column and scale
+PCSM_RATES = {
+    f"{PCSM_METRIC_PREFIX}copy_read_size_bytes_total": ("clone_read_mb_per_sec", 1024 * 1024),
+    f"{PCSM_METRIC_PREFIX}copy_insert_size_bytes_total": ("clone_insert_mb_per_sec", 1024 * 1024),
+    f"{PCSM_METRIC_PREFIX}copy_read_document_total": ("clone_read_docs_per_sec", 1),
+    f"{PCSM_METRIC_PREFIX}events_applied_total": ("events_applied_per_sec", 1),
+    f"{PCSM_METRIC_PREFIX}process_cpu_seconds_total": ("cpu_cores", 1),
+    "go_gc_duration_seconds_sum": ("gc_seconds_per_sec", 1),
+}
+
+class PcsmMetricsRecorder:
+    """
+    Scrapes csync /metrics at a fixed interval in a background thread,
+    samples are kept in memory and turned into a DataFrame with rate columns
+    """
+    def __init__(self, csync, interval=1.0):
+        self.csync = csync
+        self.interval = interval
+        self.samples = []
+        self.errors = 0
+        self._event = Event()
+        self._thread = None
+        self._start_time = None
+
+    def start(self):
+        self._start_time = time.time()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._event.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._event.is_set():
+            scraped_at = time.time()
+            response = self.csync.metrics(timeout=max(1, int(self.interval * 5)))
+            if response.get("success"):
+                sample = {"time": scraped_at - self._start_time}
+                sample.update(response["data"])
+                self.samples.append(sample)
+            else:
+                self.errors += 1
+            self._event.wait(max(0.0, self.interval - (time.time() - scraped_at)))
+
+    def dataframe(self):
+        df = pd.DataFrame(list(self.samples))
+        if df.empty:
+            return df
+        elapsed = df["time"].diff()
+        for counter, (column, scale) in PCSM_RATES.items():
+            if counter in df:
+                # counters restart from zero together with the process
+                df[column] = (df[counter].diff().clip(lower=0) / elapsed / scale).fillna(0)
+        return df
+
+    def summary(self):
+        df = self.dataframe()
+        summary = {"samples": len(df), "scrape_errors": self.errors}
+        if df.empty:
+            return summary
+        rss = f"{PCSM_METRIC_PREFIX}process_resident_memory_bytes"
+        if rss in df:
+            summary["peak_rss_mb"] = round(float(df[rss].max()) / (1024 * 1024), 1)
+        copied = f"{PCSM_METRIC_PREFIX}copy_read_size_bytes_total"
+        if copied in df:
+            active = df[df["clone_read_mb_per_sec"] > 0]
+            if not active.empty:
+                clone_time = float(active["time"].iloc[-1] - active["time"].iloc[0]) + self.interval
+                clone_mb = float(df[copied].iloc[-1] - df[copied].iloc[0]) / (1024 * 1024)
+                summary["clone_seconds"] = round(clone_time, 1)
+                summary["avg_clone_mb_per_sec"] = round(clone_mb / clone_time, 2)
+                summary["peak_clone_mb_per_sec"] = round(float(active["clone_read_mb_per_sec"].max()), 2)
+        for metric, key in ((f"{PCSM_METRIC_PREFIX}repl_event_queue_size", "max_repl_queue_size"),
+                            (f"{PCSM_METRIC_PREFIX}lag_time_seconds", "max_lag_seconds")):
+            if metric in df:
+                summary[key] = float(df[metric].max())
+        for column, key in (("events_applied_per_sec", "peak_events_applied_per_sec"),
+                            ("cpu_cores", "peak_cpu_cores"),
+                            ("gc_seconds_per_sec", "peak_gc_seconds_per_sec")):
+            if column in df:
+                summary[key] = round(float(df[column].max()), 3)
+        if "gc_seconds_per_sec" in df:
+            summary["avg_gc_seconds_per_sec"] = round(float(df["gc_seconds_per_sec"].mean()), 4)
+        return summary
+
+    def write_csv(self, test_name):
+        df = self.dataframe()
+        if df.empty:
+            return None
+        filename = f"graphs/pcsm_metrics_{test_name}.csv"
+        df.to_csv(filename, index=False)
+        os.chmod(filename, 0o666)
+        return filename
@@ -0,0 +1,22 @@
+import pytest
+
+@pytest.mark.parametrize("cluster_configs", ["replicaset"], indirect=True)
+@pytest.mark.timeout(300, func_only=True)
+def test_csync_api_direct_http(start_cluster, src_cluster, dst_cluster, csync, monkeypatch):
+    """
+    Asserts that PCSM API calls from the test container go over HTTP to the
+    forwarded port and never fall back to curl through docker exec
+    """
+    exec_calls = []
+    def exec_request(method, path, body, timeout):
+        exec_calls.append(f"{method} {path}")
+        return 1, ""
+    monkeypatch.setattr(csync, "_exec_request", exec_request)
+
+    assert csync.start(), "Failed to start csync service"
+    assert csync.wait_for_repl_stage(), "Failed to start replication stage"
+    assert csync.status()["success"], "Failed to get csync status"
+    assert csync.metrics()["success"], "Failed to get csync metrics"
+    assert csync.finalize(), "Failed to finalize csync service"
+    assert exec_calls == [], f"PCSM API calls fell back to docker exec: {exec_calls}"
+    assert csync._direct_api, "Direct PCSM API mode was disabled"
@@ -0,0 +1,93 @@
+import time
+import pymongo
+import pytest
+
+from benchmark import BenchmarkResults, RateWriter, sample_repl_metrics, wait_for_lag_below
+from cluster import Cluster
+from data_integrity_check import compare_data
+from metrics_collector import PCSM_METRIC_PREFIX, PcsmMetricsRecorder
+
+STEADY_RATE = 2000
+BURST_SIZES = [100_000, 1_000_000, 5_000_000]
+BURST_SECONDS = 30
+BASELINE_SECONDS = 30
+# lag above the steady-state mean that still counts as recovered
+LAG_TOLERANCE_SECONDS = 1.0
+RECOVERY_TIMEOUT = 1800
+
+def inject_burst(connection_string, size, seconds):
+    """
+    Inserts size documents aiming to finish in seconds, returns (inserted, elapsed seconds)
+    """
+    writer = RateWriter(connection_string, collection=f"burst_{size}", ops_per_sec=size / seconds,
+                        threads=16, batch_size=1000, doc_size=128)
+    start_time = time.time()
+    writer.start()
+    while writer.ops < size and time.time() - start_time < seconds * 10:
+        time.sleep(0.05)
+    writer.stop()
+    return writer.ops, time.time() - start_time
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("cluster_configs", ["replicaset", "sharded"], indirect=True)
+@pytest.mark.csync_log_level("info")
+@pytest.mark.timeout(14400, func_only=True)
+def test_bench_burst_absorption(start_cluster, src_cluster, dst_cluster, csync):
+    """
+    Injects write bursts of several sizes on top of a steady load and reports the
+    lag peak, time back to the steady-state lag and the event queue profile
+    """
+    src = pymongo.MongoClient(src_cluster.connection)
+    src.drop_database("bench_load")
+    if src_cluster.is_sharded:
+        src.admin.command("enableSharding", "bench_load")
+        for coll_name in ["load"] + [f"burst_{size}" for size in BURST_SIZES]:
+            src.admin.command("shardCollection", f"bench_load.{coll_name}", key={"_id": "hashed"})
+    assert csync.start(), "Failed to start csync service"
+    assert csync.wait_for_repl_stage(), "Failed to start replication stage"
+
+    results = BenchmarkResults(f"burst_{src_cluster.layout}")
+    steady = RateWriter(src_cluster.connection, ops_per_sec=STEADY_RATE, mode="mixed")
+    steady.start()
+    try:
+        for size in BURST_SIZES:
+            samples = sample_repl_metrics(csync, BASELINE_SECONDS)
+            assert samples, "No metrics available to measure the steady-state baseline"
+            baseline_lag = sum(lag for _, lag, _, _ in samples) / len(samples)
+            baseline_queue = max(queue for _, _, queue, _ in samples)
+
+            recorder = PcsmMetricsRecorder(csync, interval=0.5).start()
+            try:
+                burst_start = time.time()
+                inserted, burst_seconds = inject_burst(src_cluster.connection, size, BURST_SECONDS)
+                recovery_seconds = wait_for_lag_below(csync, baseline_lag + LAG_TOLERANCE_SECONDS,
+                                                      max_queue=baseline_queue, timeout=RECOVERY_TIMEOUT)
+                recovered_at = time.time()
+            finally:
+                recorder.stop()
+            recorder.write_csv(f"burst_{src_cluster.layout}_{size}")
+            summary = recorder.summary()
+            df = recorder.dataframe()
+            queue_column = f"{PCSM_METRIC_PREFIX}repl_event_queue_size"
+            queue_peak_at = None
+            if queue_column in df and not df.empty:
+                queue_peak_at = round(float(df.loc[df[queue_column].idxmax(), "time"]), 1)
+            results.add(burst_size=size, inserted=inserted, burst_seconds=round(burst_seconds, 1),
+                        burst_ops_per_sec=round(inserted / burst_seconds),
+                        baseline_lag_seconds=round(baseline_lag, 2), baseline_queue=baseline_queue,
+                        peak_lag_seconds=summary.get("max_lag_seconds"),
+                        peak_queue=summary.get("max_repl_queue_size"), queue_peak_at_seconds=queue_peak_at,
+                        peak_events_per_sec=summary.get("peak_events_applied_per_sec"),
+                        recovery_after_burst_seconds=round(recovery_seconds, 1) if recovery_seconds is not None else None,
+                        recovery_from_burst_start_seconds=round(recovered_at - burst_start, 1)
+                        if recovery_seconds is not None else None,
+                        peak_rss_mb=summary.get("peak_rss_mb"))
+            assert recovery_seconds is not None, f"Lag did not return to baseline within {RECOVERY_TIMEOUT}s after {size} writes"
+    finally:
+        steady.stop()
+    results.write()
+    Cluster.log(f"Slowest burst recovery: {results.best('recovery_after_burst_seconds')}")
+    assert csync.wait_for_zero_lag(), "Failed to catch up on replication"
+    assert csync.finalize(), "Failed to finalize csync service"
+    result, _ = compare_data(src_cluster, dst_cluster)
+    assert result is True, "Data mismatch after synchronization"
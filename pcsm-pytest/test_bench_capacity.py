@@ -0,0 +1,106 @@
+import time
+import pymongo
+import pytest
+
+from benchmark import BenchmarkResults, RateWriter, sample_repl_metrics, slope
+from cluster import Cluster
+from conftest import SETUP_TYPES
+
+# Rate is raised by STEP_FACTOR until lag stops being bounded, then narrowed down
+# with SEARCH_ITERATIONS bisection steps between the last good and the first bad rate
+START_RATE = 1000
+STEP_FACTOR = 1.5
+MAX_RATE = 200_000
+SEARCH_ITERATIONS = 3
+WARMUP_SECONDS = 15
+SOAK_SECONDS = 60
+MAX_LAG_SECONDS = 10
+# lag may not grow faster than this over the soak window, in seconds per second
+MAX_LAG_GROWTH = 0.05
+# queue may not grow faster than this share of the offered rate
+MAX_QUEUE_GROWTH = 0.01
+# the source is the bottleneck when it accepts less than this share of the offered rate
+MIN_ACHIEVED_RATIO = 0.95
+
+def run_step(csync, writer, rate):
+    writer.set_rate(rate)
+    time.sleep(WARMUP_SECONDS)
+    ops_start = writer.ops
+    start_time = time.time()
+    samples = sample_repl_metrics(csync, SOAK_SECONDS)
+    achieved = (writer.ops - ops_start) / (time.time() - start_time)
+    assert samples, "Failed to scrape csync metrics"
+    lag_growth = slope([(t, lag) for t, lag, _, _ in samples])
+    queue_growth = slope([(t, queue) for t, _, queue, _ in samples])
+    max_lag = max(lag for _, lag, _, _ in samples)
+    elapsed = samples[-1][0] - samples[0][0]
+    applied_rate = (samples[-1][3] - samples[0][3]) / elapsed if elapsed > 0 else 0
+    return {
+        "target_ops_per_sec": int(rate),
+        "achieved_ops_per_sec": round(achieved),
+        "applied_events_per_sec": round(applied_rate),
+        "max_lag_seconds": round(max_lag, 1),
+        "lag_growth": round(lag_growth, 3),
+        "queue_growth": round(queue_growth, 1),
+        "source_bound": achieved < rate * MIN_ACHIEVED_RATIO,
+        "stable": max_lag <= MAX_LAG_SECONDS and lag_growth <= MAX_LAG_GROWTH
+                  and queue_growth <= rate * MAX_QUEUE_GROWTH,
+    }
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("cluster_configs", SETUP_TYPES, indirect=True)
+@pytest.mark.csync_log_level("info")
+@pytest.mark.timeout(10800, func_only=True)
+def test_bench_max_sustainable_throughput(start_cluster, src_cluster, dst_cluster, csync, request):
+    """
+    Searches for the highest source write rate at which PCSM lag and event queue
+    stay flat over the soak window and reports it for the topology
+    """
+    topology = request.node.callspec.params["cluster_configs"]
+    src = pymongo.MongoClient(src_cluster.connection)
+    if src_cluster.is_sharded:
+        src.admin.command("enableSharding", "bench_load")
+        src.admin.command("shardCollection", "bench_load.load", key={"_id": "hashed"})
+    assert csync.start(), "Failed to start csync service"
+    assert csync.wait_for_repl_stage(), "Failed to start replication stage"
+
+    results = BenchmarkResults(f"capacity_{topology}")
+    writer = RateWriter(src_cluster.connection, ops_per_sec=START_RATE, threads=8, mode="mixed").start()
+    good, bad = None, None
+    try:
+        def measure(rate):
+            row = run_step(csync, writer, rate)
+            results.add(topology=topology, **row)
+            if not row["stable"]:
+                # drain the backlog so the next step starts from zero lag
+                writer.stop()
+                assert csync.wait_for_zero_lag(timeout=900), "Failed to drain backlog after unstable step"
+                writer.start()
+            return row
+
+        rate = START_RATE
+        while rate <= MAX_RATE:
+            row = measure(rate)
+            if row["source_bound"]:
+                Cluster.log(f"Source accepts only {row['achieved_ops_per_sec']} ops/s, stopping the search")
+                break
+            if not row["stable"]:
+                bad = rate
+                break
+            good = rate
+            rate *= STEP_FACTOR
+        if good is not None and bad is not None:
+            for _ in range(SEARCH_ITERATIONS):
+                rate = (good + bad) / 2
+                row = measure(rate)
+                if row["stable"] and not row["source_bound"]:
+                    good = rate
+                else:
+                    bad = rate
+    finally:
+        writer.stop()
+    results.write()
+    Cluster.log(f"Max sustainable throughput for {topology}: {int(good) if good else 'below ' + str(START_RATE)} ops/s"
+                + (f", first unstable rate {int(bad)} ops/s" if bad else ", lag stayed bounded at every tested rate"))
+    assert good is not None, f"Lag was not bounded even at {START_RATE} ops/s"
+    assert csync.wait_for_zero_lag(timeout=900), "Failed to catch up on replication"
@@ -0,0 +1,134 @@
+import random
+import string
+import struct
+import time
+import uuid
+import pymongo
+import pytest
+from bson import BSON, Binary, ObjectId
+from bson.binary import UUID_SUBTYPE
+
+from benchmark import BenchmarkResults, count_mismatches, reset_sync, wait_for_clone
+from cluster import Cluster
+from metrics_collector import PcsmMetricsRecorder
+
+DB_NAME = "bench_segments"
+# ~1GB per collection, above the ~480MB minimum clone segment size
+NUM_DOCS = 1_000_000
+DOC_SIZE = 1024
+BATCH_SIZE = 5000
+READ_WORKERS = [1, 8]
+# a clone is reported as degraded when more read workers barely help
+MIN_SPEEDUP = 1.5
+
+def objectid_ids(rng, start, count):
+    base = 1_700_000_000
+    return [ObjectId(struct.pack(">I", base + i // 1000) + rng.randbytes(8)) for i in range(start, start + count)]
+
+def int_ids(rng, start, count):
+    return list(range(start, start + count))
+
+def string_ids(rng, start, count):
+    return [f"user-{rng.randrange(10**12):012d}-{i}" for i in range(start, start + count)]
+
+def uuid_ids(rng, start, count):
+    return [Binary.from_uuid(uuid.UUID(int=rng.getrandbits(128), version=4), UUID_SUBTYPE) for _ in range(count)]
+
+def compound_ids(rng, start, count):
+    return [{"tenant": i % 100, "seq": i} for i in range(start, start + count)]
+
+def mixed_ids(rng, start, count):
+    generators = [int_ids, string_ids, objectid_ids, uuid_ids, compound_ids]
+    return [generators[i % len(generators)](rng, i, 1)[0] for i in range(start, start + count)]
+
+ID_TYPES = {
+    "objectid": objectid_ids,
+    "int": int_ids,
+    "string": string_ids,
+    "uuid": uuid_ids,
+    "compound": compound_ids,
+    "mixed": mixed_ids,
+}
+
+def seed_id_collection(client, id_type, seed=42):
+    """
+    Fills DB_NAME.<id_type> with NUM_DOCS documents keyed by the given _id generator,
+    returns the total BSON size
+    """
+    rng = random.Random(seed)
+    payload = "".join(rng.choices(string.ascii_letters, k=DOC_SIZE))
+    collection = client[DB_NAME][id_type]
+    total_bytes = 0
+    Cluster.log(f"Seeding {DB_NAME}.{id_type} with {NUM_DOCS} documents")
+    for offset in range(0, NUM_DOCS, BATCH_SIZE):
+        docs = [{"_id": _id, "payload": payload} for _id in ID_TYPES[id_type](rng, offset, BATCH_SIZE)]
+        total_bytes += sum(len(BSON.encode(doc)) for doc in docs)
+        collection.insert_many(docs, ordered=False)
+    return total_bytes
+
+def segment_count(csync, namespace):
+    csync.log_tailer.catch_up()
+    for match in csync.log_tailer.get_matches("segmenter"):
+        if match.group(1) == namespace:
+            return int(match.group(2))
+    return None
+
+def tail_fraction(df, threshold=0.5):
+    """
+    Share of the clone during which the read rate stayed under threshold of its peak,
+    uneven segments leave a long tail copied by a single worker
+    """
+    if "clone_read_mb_per_sec" not in df:
+        return None
+    active = df[df["clone_read_mb_per_sec"] > 0]
+    if active.empty:
+        return None
+    slow = active[active["clone_read_mb_per_sec"] < active["clone_read_mb_per_sec"].max() * threshold]
+    return round(len(slow) / len(active), 2)
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("cluster_configs", ["replicaset"], indirect=True)
+# the "Segmenter for" line is logged at debug level, as in test_clone_segmenter_rs.py
+@pytest.mark.csync_log_level("debug")
+@pytest.mark.timeout(14400, func_only=True)
+def test_bench_clone_segmentation(start_cluster, src_cluster, dst_cluster, csync):
+    """
+    Clones large collections keyed by ObjectId, int, string, UUID, compound and mixed
+    type _id with one and several read workers and reports the segment count, the
+    speedup from parallel reads and the slow tail of the clone for every _id type
+    """
+    client = pymongo.MongoClient(src_cluster.connection)
+    client.drop_database(DB_NAME)
+    results = BenchmarkResults(f"clone_segmentation_{src_cluster.layout}")
+    for id_type in ID_TYPES:
+        namespace = f"{DB_NAME}.{id_type}"
+        dataset_mb = seed_id_collection(client, id_type) / (1024 * 1024)
+        single_worker_seconds = None
+        for workers in READ_WORKERS:
+            reset_sync(csync, dst_cluster, log_level="debug")
+            recorder = PcsmMetricsRecorder(csync, interval=0.5).start()
+            start_time = time.time()
+            try:
+                assert csync.start(raw_args={"includeNamespaces": [namespace], "cloneNumReadWorkers": workers}), \
+                    f"Failed to start csync for {namespace}"
+                assert wait_for_clone(csync) is not None, f"Clone of {namespace} did not complete"
+                clone_seconds = time.time() - start_time
+            finally:
+                recorder.stop()
+            recorder.write_csv(f"clone_segmentation_{id_type}_{workers}")
+            summary = recorder.summary()
+            assert not count_mismatches(src_cluster, dst_cluster, DB_NAME), f"Document count mismatch for {namespace}"
+            single_worker_seconds = single_worker_seconds or clone_seconds
+            speedup = round(single_worker_seconds / clone_seconds, 2)
+            segments = segment_count(csync, namespace)
+            assert segments is not None, f"No 'Segmenter for {namespace}' line in PCSM logs"
+            results.add(id_type=id_type, read_workers=workers, segments=segments,
+                        clone_seconds=round(clone_seconds, 1), mb_per_sec=round(dataset_mb / clone_seconds, 1),
+                        peak_read_mb_per_sec=summary.get("peak_clone_mb_per_sec"),
+                        speedup=speedup, tail_fraction=tail_fraction(recorder.dataframe()),
+                        degraded=workers > 1 and (segments <= 1 or speedup < MIN_SPEEDUP))
+        client.drop_database(DB_NAME)
+    results.write()
+    for row in results.rows:
+        if row["degraded"]:
+            Cluster.log(f"Clone of {row['id_type']} _id does not scale with {row['read_workers']} read workers: {row}")
@@ -0,0 +1,64 @@
+import itertools
+import pytest
+
+from benchmark import (BenchmarkResults, ContainerSampler, count_mismatches, reset_sync, seed_collections,
+                       wait_for_clone)
+from cluster import Cluster
+from metrics_collector import PcsmMetricsRecorder
+
+# Every combination of the grid is cloned for every dataset shape,
+# None keeps the PCSM default for that option
+CLONE_GRID = {
+    "cloneNumReadWorkers": [2, 8],
+    "cloneNumInsertWorkers": [2, 8],
+    "cloneNumParallelCollections": [2, 8],
+    "cloneSegmentSize": [None, "500MB"],
+    "cloneReadBatchSize": [None, "16MiB"],
+}
+
+DATASET_SHAPES = {
+    "small_docs": {"num_collections": 8, "docs_per_collection": 250_000, "doc_size": 256},
+    "large_docs": {"num_collections": 4, "docs_per_collection": 20_000, "doc_size": 16_384},
+    "single_collection": {"num_collections": 1, "docs_per_collection": 2_000_000, "doc_size": 512},
+}
+
+def grid_cells(grid):
+    for values in itertools.product(*grid.values()):
+        yield {key: value for key, value in zip(grid, values) if value is not None}
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("cluster_configs", ["replicaset"], indirect=True)
+@pytest.mark.parametrize("shape", list(DATASET_SHAPES))
+@pytest.mark.timeout(14400, func_only=True)
+def test_bench_clone_tuning(start_cluster, src_cluster, dst_cluster, csync, shape):
+    """
+    Sweeps clone start options over the same seeded dataset and reports clone duration,
+    MB/s, peak PCSM RSS and target CPU for each cell and the best configuration
+    """
+    dataset_bytes = seed_collections(src_cluster.connection, db_name="bench", **DATASET_SHAPES[shape])
+    results = BenchmarkResults(f"clone_tuning_{shape}")
+    for options in grid_cells(CLONE_GRID):
+        reset_sync(csync, dst_cluster)
+        recorder = PcsmMetricsRecorder(csync, interval=0.5).start()
+        sampler = ContainerSampler().start()
+        try:
+            assert csync.start(raw_args=options), f"Failed to start csync with {options}"
+            clone_seconds = wait_for_clone(csync)
+        finally:
+            recorder.stop()
+            sampler.stop()
+        assert clone_seconds is not None, f"Clone did not complete with {options}"
+        mismatches = count_mismatches(src_cluster, dst_cluster, "bench")
+        assert not mismatches, f"Document count mismatch with {options}: {mismatches}"
+        summary = recorder.summary()
+        target_cpu_avg, target_cpu_peak, _ = sampler.peaks(dst_cluster.all_hosts)
+        results.add(shape=shape,
+                    **{key: options.get(key, "default") for key in CLONE_GRID},
+                    clone_seconds=round(clone_seconds, 1),
+                    mb_per_sec=round(dataset_bytes / (1024 * 1024) / clone_seconds, 1),
+                    peak_rss_mb=summary.get("peak_rss_mb"),
+                    target_cpu_avg=target_cpu_avg,
+                    target_cpu_peak=target_cpu_peak)
+    results.write()
+    best = results.best("mb_per_sec")
+    Cluster.log(f"Best clone configuration for {shape}: {best}")
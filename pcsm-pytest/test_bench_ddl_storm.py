@@ -0,0 +1,105 @@
+import time
+import pymongo
+import pytest
+from threading import Thread, Event
+
+from benchmark import BenchmarkResults, RateWriter, sample_repl_metrics, wait_for_lag_below
+from cluster import Cluster
+from data_integrity_check import compare_data
+
+CRUD_RATE = 2000
+# DDL operations per second during a burst, 0 measures CRUD load alone
+DDL_RATES = [0, 1, 5, 20]
+BURST_SECONDS = 30
+RECOVERY_TIMEOUT = 600
+DDL_DB = "bench_ddl"
+
+def ddl_cycle(db, i):
+    """
+    Yields the DDL operations of one create/index/collMod/rename/drop cycle
+    """
+    name = f"coll_{i}"
+    yield lambda: db.create_collection(name)
+    yield lambda: db[name].create_index([("a", pymongo.ASCENDING), ("b", pymongo.DESCENDING)], name="a_b")
+    yield lambda: db.command({"collMod": name, "validator": {"a": {"$exists": True}}, "validationLevel": "moderate"})
+    yield lambda: db[name].drop_index("a_b")
+    yield lambda: db[name].rename(f"renamed_{i}")
+    yield lambda: db.drop_collection(f"renamed_{i}")
+
+def run_ddl(db, rate, stop_event, counter, errors):
+    interval = 1.0 / rate
+    deadline = time.time()
+    cycle = 0
+    # a started cycle is always completed so no half-renamed collections are left behind
+    try:
+        while not stop_event.is_set():
+            for ddl in ddl_cycle(db, cycle):
+                ddl()
+                counter["ddl"] += 1
+                deadline += interval
+                delay = deadline - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            cycle += 1
+    except Exception as e:
+        errors.append(e)
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("cluster_configs", ["replicaset", "sharded"], indirect=True)
+@pytest.mark.csync_log_level("info")
+@pytest.mark.timeout(3600, func_only=True)
+def test_bench_ddl_storm(start_cluster, src_cluster, dst_cluster, csync):
+    """
+    Runs DDL bursts at increasing rates on top of a steady CRUD load and measures
+    lag peak, recovery time after each burst and events applied per second
+    """
+    src = pymongo.MongoClient(src_cluster.connection)
+    if src_cluster.is_sharded:
+        src.admin.command("enableSharding", "bench_load")
+        src.admin.command("shardCollection", "bench_load.load", key={"_id": "hashed"})
+    assert csync.start(), "Failed to start csync service"
+    assert csync.wait_for_repl_stage(), "Failed to start replication stage"
+
+    results = BenchmarkResults(f"ddl_storm_{src_cluster.layout}")
+    writer = RateWriter(src_cluster.connection, ops_per_sec=CRUD_RATE, threads=4, mode="mixed").start()
+    try:
+        baseline = sample_repl_metrics(csync, 30)
+        assert baseline, "No csync metrics available to measure the baseline lag"
+        baseline_lag = max(lag for _, lag, _, _ in baseline)
+        Cluster.log(f"Baseline lag under {CRUD_RATE} ops/s CRUD load: {baseline_lag}s")
+        for rate in DDL_RATES:
+            stop_event = Event()
+            counter = {"ddl": 0}
+            errors = []
+            ddl_thread = None
+            if rate:
+                ddl_thread = Thread(target=run_ddl, args=(src[DDL_DB], rate, stop_event, counter, errors),
+                                    daemon=True)
+                ddl_thread.start()
+            samples = sample_repl_metrics(csync, BURST_SECONDS, interval=0.5)
+            stop_event.set()
+            if ddl_thread:
+                ddl_thread.join()
+            assert not errors, f"DDL at {rate}/s failed after {counter['ddl']} operations: {errors[0]!r}"
+            # the peaks usually come after the burst while the queued DDL is applied, so keep
+            # sampling until lag is back near the baseline
+            recovery_samples = []
+            recovery_seconds = wait_for_lag_below(csync, baseline_lag + 1, timeout=RECOVERY_TIMEOUT,
+                                                  samples=recovery_samples)
+            assert samples, f"No csync metrics were scraped during the DDL burst at {rate}/s"
+            elapsed = samples[-1][0] - samples[0][0]
+            results.add(ddl_rate=rate,
+                        ddl_ops=counter["ddl"],
+                        crud_ops_per_sec=CRUD_RATE,
+                        events_applied_per_sec=round((samples[-1][3] - samples[0][3]) / elapsed) if elapsed else None,
+                        lag_peak_seconds=max(lag for _, lag, _, _ in samples + recovery_samples),
+                        queue_peak=int(max(queue for _, _, queue, _ in samples + recovery_samples)),
+                        recovery_seconds=round(recovery_seconds, 1) if recovery_seconds is not None else None)
+            assert recovery_seconds is not None, f"Lag did not recover within {RECOVERY_TIMEOUT}s after DDL rate {rate}/s"
+    finally:
+        writer.stop()
+    results.write()
+    assert csync.wait_for_zero_lag(), "Failed to catch up on replication"
+    assert csync.finalize(), "Failed to finalize csync service"
+    result, _ = compare_data(src_cluster, dst_cluster)
+    assert result is True, "Data mismatch after synchronization"
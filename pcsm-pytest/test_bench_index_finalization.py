@@ -0,0 +1,110 @@
+import datetime
+import random
+import time
+import pymongo
+import pytest
+from pymongo import IndexModel
+
+from benchmark import BenchmarkResults, ContainerSampler, count_mismatches, reset_sync, sync_and_finalize
+from cluster import Cluster
+from data_types.index_types import INDEX_TYPES
+
+DB_NAME = "bench_indexes"
+COLL_NAME = "indexed"
+NUM_FIELDS = 16
+WORDS = ["mongodb", "index", "cluster", "replica", "shard", "finalize", "clone", "oplog", "bench", "target"]
+
+PER_TYPE_DOCS = 500_000
+SCALING_INDEX_COUNTS = [1, 4, 16]
+SCALING_DOCS = [250_000, 1_000_000]
+
+def seed_indexed_collection(connection_string, num_docs, batch_size=5000, seed=42):
+    rng = random.Random(seed)
+    client = pymongo.MongoClient(connection_string)
+    client.drop_database(DB_NAME)
+    collection = client[DB_NAME][COLL_NAME]
+    # in the future so the TTL shapes do not expire documents while the benchmark runs
+    created_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=30)
+    Cluster.log(f"Seeding {DB_NAME}.{COLL_NAME} with {num_docs} documents")
+    for offset in range(0, num_docs, batch_size):
+        docs = []
+        for i in range(offset, min(offset + batch_size, num_docs)):
+            # fields indexed by the shapes in data_types/index_types.py
+            doc = {"_id": i, "created_at": created_at,
+                   "location_2d": [rng.uniform(-180, 180), rng.uniform(-90, 90)],
+                   "location_2dsphere": {"type": "Point",
+                                         "coordinates": [rng.uniform(-180, 180), rng.uniform(-90, 90)]},
+                   "hashed_field": f"user_{i}", "content": f"content{i}",
+                   "title": " ".join(rng.choices(WORDS, k=3)), "description": " ".join(rng.choices(WORDS, k=8)),
+                   "field1": f"value_{rng.randrange(1000)}", "field2": f"value_{rng.randrange(1000)}",
+                   "nested": {"subfield": f"nested_{rng.randrange(1000)}"}, "tags": rng.sample(WORDS, 3),
+                   "first_name": rng.choice(WORDS), "last_name": f"last_{i}", "age": rng.randrange(18, 80),
+                   "data": f"example{rng.randrange(1000)}"}
+            doc.update({f"f{n}": rng.randrange(1000) for n in range(NUM_FIELDS)})
+            if i % 2 == 0:
+                doc["secondary_field"] = f"extra_{i}"
+                doc["short_lived"] = True
+            if i % 10 == 0:
+                doc["partial_field"] = "indexed"
+                doc["extra_field"] = "extra_data"
+            docs.append(doc)
+        collection.insert_many(docs, ordered=False)
+    return collection
+
+def build_source_indexes(collection, indexes):
+    collection.drop_indexes()
+    start_time = time.time()
+    collection.create_indexes(indexes)
+    return time.time() - start_time
+
+def measure_sync(csync, src_cluster, dst_cluster):
+    reset_sync(csync, dst_cluster)
+    sampler = ContainerSampler().start()
+    try:
+        clone_seconds, finalize_seconds = sync_and_finalize(csync)
+    finally:
+        sampler.stop()
+    assert not count_mismatches(src_cluster, dst_cluster, DB_NAME), "Document count mismatch after finalize"
+    dst_indexes = pymongo.MongoClient(dst_cluster.connection)[DB_NAME][COLL_NAME].index_information()
+    target_cpu_avg, target_cpu_peak, target_mem_peak = sampler.peaks(dst_cluster.all_hosts)
+    return {"clone_seconds": round(clone_seconds, 1), "finalize_seconds": round(finalize_seconds, 1),
+            "target_indexes": len(dst_indexes), "target_cpu_avg": target_cpu_avg,
+            "target_cpu_peak": target_cpu_peak, "target_mem_peak_mb": target_mem_peak}
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("cluster_configs", ["replicaset"], indirect=True)
+@pytest.mark.csync_log_level("info")
+@pytest.mark.timeout(14400, func_only=True)
+def test_bench_finalize_per_index_type(start_cluster, src_cluster, dst_cluster, csync):
+    """
+    Syncs the same large collection with one index type at a time and reports clone
+    and finalize duration and target resource use next to the source build time
+    """
+    collection = seed_indexed_collection(src_cluster.connection, PER_TYPE_DOCS)
+    results = BenchmarkResults("index_finalize_per_type")
+    for index_type, indexes in INDEX_TYPES.items():
+        source_build_seconds = build_source_indexes(collection, indexes)
+        row = measure_sync(csync, src_cluster, dst_cluster)
+        assert row["target_indexes"] == len(indexes) + 1, f"Index {index_type} is missing on the target"
+        results.add(index_type=index_type, docs=PER_TYPE_DOCS,
+                    source_build_seconds=round(source_build_seconds, 1), **row)
+    results.write()
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("cluster_configs", ["replicaset"], indirect=True)
+@pytest.mark.csync_log_level("info")
+@pytest.mark.timeout(14400, func_only=True)
+def test_bench_finalize_scaling(start_cluster, src_cluster, dst_cluster, csync):
+    """
+    Reports how clone and finalize duration grow with the number of
+    secondary indexes and with collection size
+    """
+    results = BenchmarkResults("index_finalize_scaling")
+    for num_docs in SCALING_DOCS:
+        collection = seed_indexed_collection(src_cluster.connection, num_docs)
+        for count in SCALING_INDEX_COUNTS:
+            indexes = [IndexModel([(f"f{n}", pymongo.ASCENDING)], name=f"f{n}") for n in range(count)]
+            source_build_seconds = build_source_indexes(collection, indexes)
+            row = measure_sync(csync, src_cluster, dst_cluster)
+            results.add(docs=num_docs, indexes=count, source_build_seconds=round(source_build_seconds, 1), **row)
+    results.write()
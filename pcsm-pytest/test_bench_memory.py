@@ -0,0 +1,125 @@
+import csv
+import os
+import random
+import pymongo
+import pytest
+from bson import BSON, Binary
+
+from benchmark import BenchmarkResults, reset_sync, wait_for_clone
+from cluster import Cluster
+from metrics_collector import PcsmMetricsRecorder
+
+DB_NAME = "bench_memory"
+PARALLELISM = [1, 4, 16]
+# Copy a previous graphs/bench_memory_<layout>.csv here to flag peak RSS regressions
+BASELINE_FILE = "graphs/bench_memory_baseline.csv"
+REGRESSION_THRESHOLD = 1.2
+
+def near_limit_doc(rng, i):
+    return {"_id": i, "blob": Binary(rng.randbytes(15 * 1024 * 1024))}
+
+def nested_doc(rng, i, depth=90):
+    doc = {"value": i, "items": [rng.randrange(1000) for _ in range(10)]}
+    for level in range(depth):
+        doc = {"level": level, "child": doc}
+    return {"_id": i, "nested": doc}
+
+def wide_doc(rng, i, width=10000):
+    doc = {f"field_{n}": rng.randrange(1_000_000) for n in range(width)}
+    doc["_id"] = i
+    return doc
+
+# shape -> (document factory, documents cloned, documents written during replication)
+DOC_SHAPES = {
+    "near_16mb": (near_limit_doc, 100, 30),
+    "deeply_nested": (nested_doc, 100_000, 20_000),
+    "wide": (wide_doc, 20_000, 5_000),
+}
+
+def insert_shape(collection, factory, start, count, seed=42):
+    rng = random.Random(seed + start)
+    batch = []
+    batch_bytes = 0
+    doc_size = 0
+    for i in range(start, start + count):
+        doc = factory(rng, i)
+        doc_size = doc_size or len(BSON.encode(doc))
+        batch.append(doc)
+        batch_bytes += doc_size
+        if batch_bytes >= 32 * 1024 * 1024 or len(batch) >= 1000:
+            collection.insert_many(batch, ordered=False)
+            batch, batch_bytes = [], 0
+    if batch:
+        collection.insert_many(batch, ordered=False)
+    return doc_size
+
+def load_baseline():
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE, newline="") as f:
+        return {(row["shape"], row["parallelism"], row["phase"]): float(row["peak_rss_mb"])
+                for row in csv.DictReader(f) if row.get("peak_rss_mb")}
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("cluster_configs", ["replicaset"], indirect=True)
+@pytest.mark.csync_log_level("info")
+@pytest.mark.timeout(14400, func_only=True)
+def test_bench_memory_footprint(start_cluster, src_cluster, dst_cluster, csync):
+    """
+    Replicates documents near the 16MB limit, deeply nested and very wide documents
+    with different clone parallelism and records PCSM RSS and GC time during clone
+    and change stream apply, peaks above the baseline are reported as regressions
+    """
+    client = pymongo.MongoClient(src_cluster.connection)
+    baseline = load_baseline()
+    results = BenchmarkResults(f"memory_{src_cluster.layout}")
+    for shape, (factory, clone_docs, apply_docs) in DOC_SHAPES.items():
+        client.drop_database(DB_NAME)
+        collection = client[DB_NAME][shape]
+        doc_size = insert_shape(collection, factory, 0, clone_docs)
+        doc_mb = doc_size / (1024 * 1024)
+        for parallelism in PARALLELISM:
+            reset_sync(csync, dst_cluster)
+            options = {"cloneNumReadWorkers": parallelism, "cloneNumInsertWorkers": parallelism}
+            phases = {}
+            recorder = PcsmMetricsRecorder(csync, interval=0.5).start()
+            try:
+                assert csync.start(raw_args=options), f"Failed to start csync with {options}"
+                assert wait_for_clone(csync) is not None, f"Clone of {shape} did not complete"
+            finally:
+                recorder.stop()
+            phases["clone"] = recorder
+            recorder.write_csv(f"memory_{shape}_{parallelism}_clone")
+
+            recorder = PcsmMetricsRecorder(csync, interval=0.5).start()
+            try:
+                assert csync.wait_for_repl_stage(), "Failed to start replication stage"
+                insert_shape(collection, factory, clone_docs, apply_docs)
+                assert csync.wait_for_zero_lag(timeout=1800), f"Failed to catch up on {shape} writes"
+            finally:
+                recorder.stop()
+                # keep the cloned dataset identical for the next parallelism
+                collection.delete_many({"_id": {"$gte": clone_docs}})
+            phases["apply"] = recorder
+            recorder.write_csv(f"memory_{shape}_{parallelism}_apply")
+
+            for phase, phase_recorder in phases.items():
+                summary = phase_recorder.summary()
+                peak_rss = summary.get("peak_rss_mb")
+                previous = baseline.get((shape, str(parallelism), phase))
+                regression = bool(peak_rss and previous and peak_rss > previous * REGRESSION_THRESHOLD)
+                results.add(shape=shape, parallelism=parallelism, phase=phase,
+                            doc_size_mb=round(doc_mb, 3),
+                            doc_size_x_parallelism_mb=round(doc_mb * parallelism, 2),
+                            peak_rss_mb=peak_rss,
+                            rss_per_doc_x_parallelism=round(peak_rss / (doc_mb * parallelism), 1)
+                            if peak_rss else None,
+                            peak_gc_seconds_per_sec=summary.get("peak_gc_seconds_per_sec"),
+                            avg_gc_seconds_per_sec=summary.get("avg_gc_seconds_per_sec"),
+                            baseline_rss_mb=previous,
+                            regression=regression)
+    results.write()
+    regressions = [row for row in results.rows if row["regression"]]
+    for row in regressions:
+        Cluster.log(f"Peak RSS regression: {row}")
+    assert not regressions, f"Peak RSS grew more than {REGRESSION_THRESHOLD}x over {BASELINE_FILE}: {regressions}"
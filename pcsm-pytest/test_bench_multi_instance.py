@@ -0,0 +1,63 @@
+import time
+import pytest
+
+from benchmark import (BenchmarkResults, count_mismatches, drop_target_data, reset_sync, seed_collections,
+                       sync_and_finalize, wait_for_clone)
+from cluster import Cluster
+from clustersync_group import ClustersyncGroup, plan_namespace_partitions
+
+INSTANCE_COUNTS = [2, 4]
+DATASET = {"num_collections": 16, "docs_per_collection": 250_000, "doc_size": 512}
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("cluster_configs", ["replicaset", "sharded"], indirect=True)
+@pytest.mark.timeout(7200, func_only=True)
+def test_bench_multi_instance(start_cluster, src_cluster, dst_cluster, csync):
+    """
+    Compares a single PCSM instance with N instances, each replicating a size-balanced
+    includeNamespaces partition of the same dataset, by aggregate clone throughput.
+    Skipped when the instances conflict over the sync state they share on the target
+    """
+    dataset_bytes = seed_collections(src_cluster.connection, db_name="bench", is_sharded=src_cluster.is_sharded,
+                                     **DATASET)
+    dataset_mb = dataset_bytes / (1024 * 1024)
+    results = BenchmarkResults(f"multi_instance_{src_cluster.layout}")
+
+    reset_sync(csync, dst_cluster)
+    clone_seconds, finalize_seconds = sync_and_finalize(csync)
+    assert not count_mismatches(src_cluster, dst_cluster, "bench"), "Document count mismatch with single instance"
+    results.add(instances=1, clone_seconds=round(clone_seconds, 1),
+                mb_per_sec=round(dataset_mb / clone_seconds, 1), finalize_seconds=round(finalize_seconds, 1))
+    csync.destroy()
+
+    conflict = None
+    for count in INSTANCE_COUNTS:
+        drop_target_data(dst_cluster)
+        partitions = plan_namespace_partitions(src_cluster.connection, count, databases=["bench"])
+        group = ClustersyncGroup("csync", src_cluster.csync_connection, dst_cluster.csync_connection, partitions)
+        try:
+            group.create()
+            started = group.start()
+            conflict = group.shared_state_conflict()
+            if conflict:
+                break
+            assert started, f"Failed to start {count} csync instances"
+            clone_seconds = wait_for_clone(group)
+            assert clone_seconds is not None, "Clone did not complete"
+            assert group.wait_for_zero_lag(), "Failed to catch up on replication"
+            finalize_start = time.time()
+            assert group.finalize(timeout=3600), "Failed to finalize csync service"
+            finalize_seconds = time.time() - finalize_start
+            csync_error, error_logs = group.check_csync_errors()
+            assert csync_error is True, f"Csync reported errors in logs: {error_logs}"
+        finally:
+            group.destroy()
+        assert not count_mismatches(src_cluster, dst_cluster, "bench"), f"Document count mismatch with {count} instances"
+        results.add(instances=count, clone_seconds=round(clone_seconds, 1),
+                    mb_per_sec=round(dataset_mb / clone_seconds, 1), finalize_seconds=round(finalize_seconds, 1))
+    results.write()
+    if conflict:
+        pytest.skip(f"PCSM instances cannot share one target, no multi-instance throughput reported: {conflict}")
+    baseline = results.rows[0]["mb_per_sec"]
+    for row in results.rows[1:]:
+        Cluster.log(f"{row['instances']} instances: {row['mb_per_sec'] / baseline:.2f}x single instance throughput")
@@ -0,0 +1,132 @@
+import time
+import pymongo
+import pytest
+
+from benchmark import BenchmarkResults, events_applied, reset_sync, wait_for_clone, wait_for_drain
+from cluster import Cluster
+from metrics_collector import PCSM_METRIC_PREFIX, PcsmMetricsRecorder
+
+NUM_DBS = 20
+COLLS_PER_DB = 100
+DOCS_PER_COLL = 10
+# every filter keeps these, the apply phase only writes here
+HOT_COLLECTIONS = 10
+APPLY_OPS = 100_000
+BATCH_SIZE = 1000
+
+def catalog():
+    return [f"bench_ns_{d}.coll_{c}" for d in range(NUM_DBS) for c in range(COLLS_PER_DB)]
+
+def build_filters(namespaces):
+    """
+    Include and exclude lists of exact names and wildcards, namespaces[:HOT_COLLECTIONS]
+    are never filtered out. Lists longer than the catalog are padded with missing names
+    """
+    databases = sorted({ns.split(".")[0] for ns in namespaces})
+    missing = [f"bench_ns_missing.coll_{i}" for i in range(10_000)]
+    cold = namespaces[HOT_COLLECTIONS:]
+    return {
+        "none": {},
+        "include_exact_100": {"includeNamespaces": namespaces[:100]},
+        "include_exact_all": {"includeNamespaces": namespaces},
+        "include_exact_10000": {"includeNamespaces": namespaces + missing[:10_000 - len(namespaces)]},
+        "include_wildcard": {"includeNamespaces": [f"{db}.*" for db in databases]},
+        "exclude_exact_100": {"excludeNamespaces": cold[-100:]},
+        "exclude_exact_most": {"excludeNamespaces": cold},
+        "exclude_wildcard": {"excludeNamespaces": [f"{db}.*" for db in databases[1:]]},
+        "include_wildcard_exclude_exact": {"includeNamespaces": [f"{db}.*" for db in databases],
+                                           "excludeNamespaces": cold[::2]},
+    }
+
+def seed_catalog(client, namespaces):
+    Cluster.log(f"Creating {len(namespaces)} collections with {DOCS_PER_COLL} documents each")
+    for ns in namespaces:
+        db_name, coll_name = ns.split(".", 1)
+        client[db_name][coll_name].insert_many([{"_id": i, "n": 0} for i in range(DOCS_PER_COLL)])
+
+def wait_for_clone_start(csync, timeout=600, interval=0.1):
+    """
+    Returns seconds until the first cloned bytes are reported
+    """
+    start_time = time.time()
+    while time.time() - start_time < timeout:
+        status = csync.status(timeout=10)
+        initial_sync = (status.get("data") or {}).get("initialSync") or {}
+        if initial_sync.get("clonedSizeBytes") or initial_sync.get("cloneCompleted"):
+            return time.time() - start_time
+        time.sleep(interval)
+    return None
+
+def apply_updates(client, hot):
+    for offset in range(0, APPLY_OPS, BATCH_SIZE):
+        ns = hot[(offset // BATCH_SIZE) % len(hot)]
+        db_name, coll_name = ns.split(".", 1)
+        client[db_name][coll_name].bulk_write(
+            [pymongo.UpdateOne({"_id": i % DOCS_PER_COLL}, {"$inc": {"n": 1}}) for i in range(BATCH_SIZE)],
+            ordered=False)
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("cluster_configs", ["replicaset", "sharded"], indirect=True)
+@pytest.mark.csync_log_level("info")
+@pytest.mark.timeout(14400, func_only=True)
+def test_bench_namespace_filter(start_cluster, src_cluster, dst_cluster, csync):
+    """
+    Runs clone and apply over a catalog of thousands of collections with large
+    includeNamespaces/excludeNamespaces lists and reports clone start latency,
+    apply throughput and PCSM CPU per applied event for each filter
+    """
+    client = pymongo.MongoClient(src_cluster.connection)
+    namespaces = catalog()
+    databases = sorted({ns.split(".")[0] for ns in namespaces})
+    for db_name in databases:
+        client.drop_database(db_name)
+    seed_catalog(client, namespaces)
+    hot = namespaces[:HOT_COLLECTIONS]
+    dst = pymongo.MongoClient(dst_cluster.connection)
+
+    results = BenchmarkResults(f"namespace_filter_{src_cluster.layout}")
+    for name, raw_args in build_filters(namespaces).items():
+        reset_sync(csync, dst_cluster)
+        start_time = time.time()
+        assert csync.start(raw_args=raw_args), f"Failed to start csync with {name} filter"
+        start_request_seconds = time.time() - start_time
+        clone_start_seconds = wait_for_clone_start(csync)
+        assert wait_for_clone(csync) is not None, f"Clone did not complete with {name} filter"
+        # from the start request, so the filter resolution before the first cloned byte is included
+        clone_seconds = time.time() - start_time
+        assert csync.wait_for_repl_stage(), f"Failed to start replication stage with {name} filter"
+        assert csync.wait_for_zero_lag(), f"Failed to catch up with {name} filter"
+
+        assert csync.pause(), f"Failed to pause csync with {name} filter"
+        apply_updates(client, hot)
+        baseline = events_applied(csync)
+        recorder = PcsmMetricsRecorder(csync, interval=0.5).start()
+        resume_time = time.time()
+        try:
+            assert csync.resume(), f"Failed to resume csync with {name} filter"
+            drain = wait_for_drain(csync, start_time=resume_time, baseline=baseline)
+        finally:
+            recorder.stop()
+        df = recorder.dataframe()
+        cpu_column = f"{PCSM_METRIC_PREFIX}process_cpu_seconds_total"
+        cpu_ms_per_1k_events = None
+        if cpu_column in df and drain["events_applied"]:
+            cpu_seconds = float(df[cpu_column].max() - df[cpu_column].min())
+            cpu_ms_per_1k_events = round(cpu_seconds * 1000 / drain["events_applied"] * 1000, 2)
+        results.add(filter=name,
+                    include_entries=len(raw_args.get("includeNamespaces", [])),
+                    exclude_entries=len(raw_args.get("excludeNamespaces", [])),
+                    start_request_seconds=round(start_request_seconds, 2),
+                    clone_start_seconds=round(start_request_seconds + clone_start_seconds, 2)
+                                        if clone_start_seconds is not None else None,
+                    clone_seconds=round(clone_seconds, 1),
+                    target_collections=sum(len(dst[db].list_collection_names()) for db in databases),
+                    events_per_sec=drain["events_per_sec"],
+                    avg_cpu_cores=round(float(df["cpu_cores"].mean()), 2) if "cpu_cores" in df else None,
+                    cpu_ms_per_1k_events=cpu_ms_per_1k_events)
+    results.write()
+    unfiltered = results.rows[0]["events_per_sec"]
+    for row in results.rows[1:]:
+        if unfiltered and row["events_per_sec"]:
+            Cluster.log(f"{row['filter']}: {row['events_per_sec'] / unfiltered:.2f}x unfiltered apply throughput")
+    assert csync.finalize(), "Failed to finalize csync service"
@@ -0,0 +1,78 @@
+import time
+import pymongo
+import pytest
+
+from benchmark import (BenchmarkResults, RateWriter, count_mismatches, events_applied, reset_sync, seed_collections,
+                       wait_for_clone, wait_for_drain)
+from cluster import Cluster
+
+DATASET = {"num_collections": 4, "docs_per_collection": 100_000, "doc_size": 1024}
+# round trip time and jitter in ms, rate in mbit/s, loss in percent
+NETWORK_PROFILES = {
+    "lan": {},
+    "metro": {"rtt_ms": 10, "jitter_ms": 2, "rate_mbit": 1000},
+    "cross_region": {"rtt_ms": 40, "jitter_ms": 5, "rate_mbit": 500},
+    "intercontinental": {"rtt_ms": 100, "jitter_ms": 10, "rate_mbit": 200},
+    "constrained": {"rtt_ms": 20, "rate_mbit": 50},
+    "lossy": {"rtt_ms": 40, "jitter_ms": 5, "rate_mbit": 500, "loss_percent": 1},
+}
+# which link of source <-> csync <-> target is shaped
+LINKS = ["source", "target"]
+BACKLOG_RATE = 10_000
+BACKLOG_SECONDS = 30
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("cluster_configs", ["replicaset", "sharded"], indirect=True)
+@pytest.mark.csync_log_level("info")
+@pytest.mark.timeout(14400, func_only=True)
+def test_bench_network_profiles(start_cluster, src_cluster, dst_cluster, csync):
+    """
+    Shapes the source or target link of PCSM with tc netem/tbf profiles (latency,
+    jitter, rate limit, loss) and measures clone MB/s and backlog apply events/s
+    """
+    dataset_bytes = seed_collections(src_cluster.connection, db_name="bench", is_sharded=src_cluster.is_sharded,
+                                     **DATASET)
+    dataset_mb = dataset_bytes / (1024 * 1024)
+    src = pymongo.MongoClient(src_cluster.connection)
+    results = BenchmarkResults(f"network_profiles_{src_cluster.layout}")
+    for link in LINKS:
+        cluster = src_cluster if link == "source" else dst_cluster
+        for name, profile in NETWORK_PROFILES.items():
+            if not profile and link != LINKS[0]:
+                continue
+            src.drop_database("bench_load")
+            reset_sync(csync, dst_cluster)
+            try:
+                if profile:
+                    cluster.shape_link([csync.name], **profile)
+                start_time = time.time()
+                assert csync.start(), f"Failed to start csync with {name} on the {link} link"
+                assert wait_for_clone(csync) is not None, f"Clone did not complete with {name} on the {link} link"
+                clone_seconds = time.time() - start_time
+                assert csync.wait_for_repl_stage(), "Failed to start replication stage"
+                assert not count_mismatches(src_cluster, dst_cluster, "bench"), "Document count mismatch after clone"
+
+                assert csync.pause(), "Failed to pause csync"
+                writer = RateWriter(src_cluster.connection, ops_per_sec=BACKLOG_RATE, threads=8, mode="mixed")
+                writer.start()
+                time.sleep(BACKLOG_SECONDS)
+                writer.stop()
+                baseline = events_applied(csync)
+                resume_time = time.time()
+                assert csync.resume(), "Failed to resume csync"
+                drain = wait_for_drain(csync, start_time=resume_time, baseline=baseline, timeout=1800)
+                assert csync.wait_for_zero_lag(timeout=900), f"Failed to catch up with {name} on the {link} link"
+            finally:
+                if profile:
+                    cluster.reset_link([csync.name])
+            results.add(link=link if profile else "none", profile=name, rtt_ms=profile.get("rtt_ms", 0),
+                        jitter_ms=profile.get("jitter_ms", 0), rate_mbit=profile.get("rate_mbit"),
+                        loss_percent=profile.get("loss_percent", 0),
+                        clone_seconds=round(clone_seconds, 1), clone_mb_per_sec=round(dataset_mb / clone_seconds, 1),
+                        backlog_ops=writer.ops, apply_events_per_sec=drain["events_per_sec"],
+                        first_event_seconds=drain["first_event_seconds"], peak_queue=drain["peak_queue"])
+    results.write()
+    unshaped = results.rows[0]
+    for row in results.rows[1:]:
+        Cluster.log(f"{row['profile']} on the {row['link']} link: "
+                    f"{row['clone_mb_per_sec'] / unshaped['clone_mb_per_sec']:.2f}x unshaped clone throughput")
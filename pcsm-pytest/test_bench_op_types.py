@@ -0,0 +1,102 @@
+import time
+import pymongo
+import pytest
+
+from benchmark import BenchmarkResults, events_applied, wait_for_drain
+from cluster import Cluster
+from data_integrity_check import compare_data
+
+DB_NAME = "bench_ops"
+NUM_OPS = 50_000
+BATCH_SIZE = 1000
+TXN_SIZE = 100
+PAYLOAD = "x" * 200
+
+def batches(requests):
+    for offset in range(0, len(requests), BATCH_SIZE):
+        yield requests[offset:offset + BATCH_SIZE]
+
+def bulk(collection, requests):
+    for batch in batches(requests):
+        collection.bulk_write(batch, ordered=False)
+
+def op_insert_one(client, collection):
+    for i in range(NUM_OPS):
+        collection.insert_one({"_id": NUM_OPS + i, "n": i, "payload": PAYLOAD})
+
+def op_insert_many(client, collection):
+    for batch in batches(list(range(NUM_OPS, 2 * NUM_OPS))):
+        collection.insert_many([{"_id": i, "n": i, "payload": PAYLOAD} for i in batch], ordered=False)
+
+def op_update_set(client, collection):
+    bulk(collection, [pymongo.UpdateOne({"_id": i}, {"$set": {"n": -i, "tag": "set"}}) for i in range(NUM_OPS)])
+
+def op_update_pipeline(client, collection):
+    pipeline = [{"$set": {"n": {"$add": ["$n", 1]}, "tag": {"$concat": ["pipeline-", {"$toString": "$_id"}]}}}]
+    bulk(collection, [pymongo.UpdateOne({"_id": i}, pipeline) for i in range(NUM_OPS)])
+
+def op_replace(client, collection):
+    bulk(collection, [pymongo.ReplaceOne({"_id": i}, {"n": i, "replaced": True, "payload": PAYLOAD[:100]})
+                      for i in range(NUM_OPS)])
+
+def op_delete(client, collection):
+    bulk(collection, [pymongo.DeleteOne({"_id": i}) for i in range(NUM_OPS)])
+
+def op_transaction(client, collection):
+    for offset in range(0, NUM_OPS, TXN_SIZE):
+        with client.start_session() as session:
+            with session.start_transaction():
+                for i in range(offset, min(offset + TXN_SIZE, NUM_OPS)):
+                    collection.update_one({"_id": i}, {"$inc": {"n": 1}}, session=session)
+
+OP_TYPES = {
+    "insert_one": op_insert_one,
+    "insert_many": op_insert_many,
+    "update_set": op_update_set,
+    "update_pipeline": op_update_pipeline,
+    "replace": op_replace,
+    "delete": op_delete,
+    "transaction": op_transaction,
+}
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("cluster_configs", ["replicaset", "sharded"], indirect=True)
+@pytest.mark.csync_log_level("info")
+@pytest.mark.timeout(7200, func_only=True)
+def test_bench_apply_throughput_per_op_type(start_cluster, src_cluster, dst_cluster, csync):
+    """
+    For each operation type builds a backlog of NUM_OPS operations on the source while
+    sync is paused, then resumes and measures drain time and applied events per second
+    """
+    client = pymongo.MongoClient(src_cluster.connection)
+    db = client[DB_NAME]
+    client.drop_database(DB_NAME)
+    if src_cluster.is_sharded:
+        client.admin.command("enableSharding", DB_NAME)
+    for op_type in OP_TYPES:
+        if src_cluster.is_sharded:
+            client.admin.command("shardCollection", f"{DB_NAME}.{op_type}", key={"_id": "hashed"})
+        for batch in batches(list(range(NUM_OPS))):
+            db[op_type].insert_many([{"_id": i, "n": i, "payload": PAYLOAD} for i in batch], ordered=False)
+    assert csync.start(), "Failed to start csync service"
+    assert csync.wait_for_repl_stage(), "Failed to start replication stage"
+    assert csync.wait_for_zero_lag(), "Failed to catch up on replication"
+
+    results = BenchmarkResults(f"op_types_{src_cluster.layout}")
+    for op_type, generate in OP_TYPES.items():
+        assert csync.pause(), f"Failed to pause csync before {op_type}"
+        generate_start = time.time()
+        generate(client, db[op_type])
+        generate_seconds = time.time() - generate_start
+        baseline = events_applied(csync)
+        resume_time = time.time()
+        assert csync.resume(), f"Failed to resume csync after {op_type}"
+        drain = wait_for_drain(csync, start_time=resume_time, baseline=baseline)
+        assert csync.wait_for_zero_lag(), f"Failed to catch up on replication after {op_type}"
+        results.add(op_type=op_type, ops=NUM_OPS, source_ops_per_sec=round(NUM_OPS / generate_seconds), **drain)
+    results.write()
+    slowest = results.best("events_per_sec", maximize=False)
+    Cluster.log(f"Slowest operation type to apply: {slowest}")
+    assert csync.finalize(), "Failed to finalize csync service"
+    result, _ = compare_data(src_cluster, dst_cluster)
+    assert result is True, "Data mismatch after synchronization"
@@ -0,0 +1,165 @@
+import re
+import time
+import pymongo
+import pytest
+from threading import Thread, Event
+
+from benchmark import BenchmarkResults, RateWriter, count_mismatches, reset_sync, seed_collections, wait_for_clone
+from cluster import Cluster
+from metrics_collector import PcsmMetricsRecorder
+
+DATASET = {"num_collections": 8, "docs_per_collection": 100_000, "doc_size": 1024}
+CRUD_RATE = 5000
+CRUD_SECONDS = 60
+# (source URI options, target URI options), None keeps the driver defaults
+POOL_CASES = [
+    (None, None),
+    ("maxPoolSize=5", "maxPoolSize=5"),
+    ("maxPoolSize=10", "maxPoolSize=10"),
+    ("maxPoolSize=25", "maxPoolSize=25"),
+    ("maxPoolSize=50", "maxPoolSize=50"),
+    ("maxPoolSize=200", "maxPoolSize=200"),
+    ("maxPoolSize=500", "maxPoolSize=500"),
+    ("maxPoolSize=0", "maxPoolSize=0"),
+    ("maxPoolSize=10", "maxPoolSize=200"),
+    ("maxPoolSize=200", "maxPoolSize=10"),
+    # PCSM strips these today, the stripped_options column shows whether they took effect
+    ("maxPoolSize=100&minPoolSize=50", "maxPoolSize=100&minPoolSize=50"),
+    ("maxPoolSize=100&maxConnecting=8", "maxPoolSize=100&maxConnecting=8"),
+]
+# a pool size is recommended when it is within these margins of the best run
+THROUGHPUT_MARGIN = 0.95
+LAG_MARGIN_SECONDS = 1.0
+
+def with_options(uri, options):
+    if not options:
+        return uri
+    return f"{uri}{'&' if '?' in uri else '?'}{options}"
+
+class ConnectionSampler:
+    """
+    Polls serverStatus connections on the source and target entry points,
+    keeping the peak of current connections and the number created
+    """
+    def __init__(self, clusters, interval=1.0):
+        self.clients = {name: pymongo.MongoClient(cluster.connection) for name, cluster in clusters.items()}
+        self.interval = interval
+        self.peak = {name: 0 for name in clusters}
+        self.created = {name: 0 for name in clusters}
+        self._first_created = {}
+        self._event = Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._event.set()
+        self._thread.join()
+        for client in self.clients.values():
+            client.close()
+        return self
+
+    def _run(self):
+        while not self._event.is_set():
+            for name, client in self.clients.items():
+                try:
+                    connections = client.admin.command("serverStatus")["connections"]
+                except pymongo.errors.PyMongoError:
+                    continue
+                self.peak[name] = max(self.peak[name], connections["current"])
+                self._first_created.setdefault(name, connections["totalCreated"])
+                self.created[name] = connections["totalCreated"] - self._first_created[name]
+            self._event.wait(self.interval)
+
+def pool_size(options):
+    match = re.search(r"maxPoolSize=(\d+)", options or "")
+    # driver default is 100, 0 means unlimited
+    size = int(match.group(1)) if match else 100
+    return size or float("inf")
+
+def recommend(rows):
+    """
+    Smallest source maxPoolSize whose clone and apply throughput are within THROUGHPUT_MARGIN
+    of the best run without adding more than LAG_MARGIN_SECONDS of lag
+    """
+    measured = [row for row in rows if row["clone_mb_per_sec"] and row["events_per_sec"]]
+    if not measured:
+        return None
+    best_clone = max(row["clone_mb_per_sec"] for row in measured)
+    best_apply = max(row["events_per_sec"] for row in measured)
+    best_lag = min(row["max_lag_seconds"] or 0 for row in measured)
+    candidates = [row for row in measured
+                  if row["src_options"] == row["dst_options"] and not row["stripped_options"]
+                  and row["clone_mb_per_sec"] >= best_clone * THROUGHPUT_MARGIN
+                  and row["events_per_sec"] >= best_apply * THROUGHPUT_MARGIN
+                  and (row["max_lag_seconds"] or 0) <= best_lag + LAG_MARGIN_SECONDS]
+    candidates.sort(key=lambda row: pool_size(row["src_options"]))
+    return candidates[0] if candidates else None
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("cluster_configs", ["replicaset", "sharded"], indirect=True)
+@pytest.mark.csync_log_level("info")
+@pytest.mark.timeout(14400, func_only=True)
+def test_bench_pool_size(start_cluster, src_cluster, dst_cluster, csync):
+    """
+    Sweeps maxPoolSize, minPoolSize and maxConnecting on the source and target URIs under
+    the same clone and CRUD workload, reports clone and apply throughput, lag and
+    serverStatus connection counts and recommends a pool size for the topology
+    """
+    dataset_bytes = seed_collections(src_cluster.connection, db_name="bench", is_sharded=src_cluster.is_sharded,
+                                     **DATASET)
+    dataset_mb = dataset_bytes / (1024 * 1024)
+    src_uri, dst_uri = csync.src, csync.dst
+    results = BenchmarkResults(f"pool_size_{src_cluster.layout}")
+    try:
+        for src_options, dst_options in POOL_CASES:
+            csync.src = with_options(src_uri, src_options)
+            csync.dst = with_options(dst_uri, dst_options)
+            reset_sync(csync, dst_cluster)
+            writer = RateWriter(src_cluster.connection, ops_per_sec=CRUD_RATE, mode="mixed")
+            writer.client.drop_database("bench_load")
+            sampler = ConnectionSampler({"source": src_cluster, "target": dst_cluster}).start()
+            clone_peak = {}
+            recorder = None
+            try:
+                assert csync.start(), f"Failed to start csync with {src_options} / {dst_options}"
+                clone_seconds = wait_for_clone(csync)
+                assert clone_seconds is not None, f"Clone did not complete with {src_options} / {dst_options}"
+                assert csync.wait_for_repl_stage(), "Failed to start replication stage"
+                clone_peak = dict(sampler.peak)
+                recorder = PcsmMetricsRecorder(csync).start()
+                writer.start()
+                time.sleep(CRUD_SECONDS)
+                writer.stop()
+                assert csync.wait_for_zero_lag(timeout=900), f"Failed to catch up with {src_options} / {dst_options}"
+            finally:
+                writer.stop()
+                writer.client.close()
+                if recorder:
+                    recorder.stop()
+                sampler.stop()
+            summary = recorder.summary()
+            df = recorder.dataframe()
+            active = df[df["events_applied_per_sec"] > 0] if "events_applied_per_sec" in df else df.iloc[0:0]
+            csync.log_tailer.catch_up()
+            stripped = {match.group(1) for match in csync.log_tailer.get_matches("stripped_option")}
+            assert not count_mismatches(src_cluster, dst_cluster, "bench"), "Document count mismatch after clone"
+            results.add(src_options=src_options, dst_options=dst_options,
+                        stripped_options=",".join(sorted(stripped)),
+                        clone_mb_per_sec=round(dataset_mb / clone_seconds, 1),
+                        events_per_sec=round(float(active["events_applied_per_sec"].mean())) if not active.empty else None,
+                        crud_ops=writer.ops, crud_errors=writer.errors,
+                        max_lag_seconds=summary.get("max_lag_seconds"),
+                        max_queue=summary.get("max_repl_queue_size"),
+                        src_conn_peak_clone=clone_peak.get("source"), dst_conn_peak_clone=clone_peak.get("target"),
+                        src_conn_peak=sampler.peak["source"], dst_conn_peak=sampler.peak["target"],
+                        src_conn_created=sampler.created["source"], dst_conn_created=sampler.created["target"])
+    finally:
+        csync.src, csync.dst = src_uri, dst_uri
+    results.write()
+    recommended = recommend(results.rows)
+    Cluster.log(f"Recommended pool settings for {src_cluster.layout}: {recommended}")
+    assert recommended is not None, "No pool configuration completed the workload"
@@ -0,0 +1,98 @@
+import time
+import pymongo
+import pytest
+from datetime import datetime, timezone
+from bson.timestamp import Timestamp
+
+from benchmark import BenchmarkResults, RateWriter, wait_for_drain
+from cluster import Cluster
+from data_integrity_check import compare_data
+
+WRITE_RATE = 2000
+BACKLOG_MINUTES = [1, 5, 15]
+# seconds of load PCSM applies right before it is killed, PCSM decides when to
+# checkpoint so the age of its last checkpoint at the kill is read and reported
+LOAD_BEFORE_KILL_SECONDS = [0, 30]
+
+def newest_time(value):
+    """
+    Latest Timestamp or datetime anywhere in a checkpoint document, in epoch seconds
+    """
+    if isinstance(value, Timestamp):
+        return value.time
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        return max((t for t in map(newest_time, value) if t is not None), default=None)
+    return None
+
+def checkpoint_time(dst_client):
+    doc = dst_client["percona_clustersync_mongodb"]["checkpoints"].find_one({"_id": "pcsm"})
+    return newest_time(doc.get("data")) if doc else None
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("cluster_configs", ["replicaset", "sharded"], indirect=True)
+@pytest.mark.csync_log_level("info")
+@pytest.mark.timeout(14400, func_only=True)
+def test_bench_recovery_time(start_cluster, src_cluster, dst_cluster, csync):
+    """
+    Kills PCSM, writes a backlog of N minutes on the source while it is down and
+    measures time to 'Checking Recovery Data', to the first applied event, drain
+    rate and time from the first applied event to zero lag after it is started
+    again, with the age of the checkpoint PCSM resumed from
+    """
+    src = pymongo.MongoClient(src_cluster.connection)
+    dst = pymongo.MongoClient(dst_cluster.connection)
+    if src_cluster.is_sharded:
+        src.admin.command("enableSharding", "bench_load")
+        src.admin.command("shardCollection", "bench_load.load", key={"_id": "hashed"})
+    assert csync.start(), "Failed to start csync service"
+    assert csync.wait_for_repl_stage(), "Failed to start replication stage"
+    assert csync.wait_for_checkpoint(), "Clustersync failed to save checkpoint"
+
+    results = BenchmarkResults(f"recovery_{src_cluster.layout}")
+    writer = RateWriter(src_cluster.connection, ops_per_sec=WRITE_RATE, threads=4, mode="mixed")
+    for load_seconds in LOAD_BEFORE_KILL_SECONDS:
+        for minutes in BACKLOG_MINUTES:
+            assert csync.wait_for_zero_lag(), "Failed to catch up before the crash"
+            writer.start()
+            time.sleep(load_seconds)
+            saved_at = checkpoint_time(dst)
+            killed_at = time.time()
+            csync.container.kill()
+            ops_before = writer.ops
+            time.sleep(minutes * 60)
+            writer.stop()
+            backlog_ops = writer.ops - ops_before
+
+            recovery_seen = csync.log_tailer.match_count("recovery")
+            start_time = time.time()
+            csync.container.start()
+            recovery = csync.log_tailer.wait_for("recovery", timeout=300, start=recovery_seen)
+            recovery_seconds = time.time() - start_time if recovery else None
+            # counters start from zero in the new process
+            drain = wait_for_drain(csync, start_time=start_time, baseline=0, timeout=3600)
+            # caught up when the last backlog event was applied, not after the drain's quiet
+            # window and the marker round trip below
+            caught_up = drain["drain_seconds"]
+            assert csync.wait_for_zero_lag(timeout=3600), f"Failed to catch up after {minutes} minute backlog"
+            first_event = drain["first_event_seconds"]
+            results.add(load_before_kill_seconds=load_seconds,
+                        checkpoint_age_seconds=round(killed_at - saved_at, 1) if saved_at else None,
+                        backlog_minutes=minutes, backlog_ops=backlog_ops,
+                        recovery_data_seconds=round(recovery_seconds, 2) if recovery_seconds else None,
+                        first_event_seconds=first_event,
+                        drain_events_per_sec=drain["events_per_sec"],
+                        zero_lag_seconds=round(caught_up - first_event, 1)
+                        if caught_up is not None and first_event is not None else None,
+                        restart_to_zero_lag_seconds=round(caught_up, 1) if caught_up is not None else None,
+                        peak_queue=drain["peak_queue"])
+            assert recovery, "PCSM did not log 'Checking Recovery Data' after restart"
+    results.write()
+    worst = results.best("restart_to_zero_lag_seconds")
+    Cluster.log(f"Slowest recovery: {worst}")
+    assert csync.finalize(), "Failed to finalize csync service"
+    result, _ = compare_data(src_cluster, dst_cluster)
+    assert result is True, "Data mismatch after synchronization"
@@ -0,0 +1,70 @@
+import time
+import pymongo
+import pytest
+
+from benchmark import BenchmarkResults, RateWriter, seed_collections, wait_for_clone
+from conftest import SETUP_TYPES
+from data_integrity_check import compare_data
+from metrics_collector import PcsmMetricsRecorder
+
+DATASET = {"num_collections": 8, "docs_per_collection": 250_000, "doc_size": 1024}
+CRUD_RATE = 10_000
+CRUD_SECONDS = 120
+WARMUP_SECONDS = 15
+
+# shared by all parametrizations so a single run produces one comparison table
+MATRIX = BenchmarkResults("topology_matrix")
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("cluster_configs", SETUP_TYPES, indirect=True)
+@pytest.mark.csync_log_level("info")
+@pytest.mark.timeout(7200, func_only=True)
+def test_bench_topology_matrix(request, start_cluster, src_cluster, dst_cluster, csync):
+    """
+    Runs the same seeded clone and CRUD workload on every source/target topology
+    pair and adds clone MB/s, steady-state events/s and finalize time to one table
+    """
+    dataset_bytes = seed_collections(src_cluster.connection, db_name="bench", is_sharded=src_cluster.is_sharded,
+                                     **DATASET)
+    src = pymongo.MongoClient(src_cluster.connection)
+    src.drop_database("bench_load")
+    if src_cluster.is_sharded:
+        src.admin.command("enableSharding", "bench_load")
+        src.admin.command("shardCollection", "bench_load.load", key={"_id": "hashed"})
+
+    clone_start = time.time()
+    assert csync.start(), "Failed to start csync service"
+    assert wait_for_clone(csync) is not None, "Clone did not complete"
+    clone_seconds = time.time() - clone_start
+    assert csync.wait_for_repl_stage(), "Failed to start replication stage"
+
+    writer = RateWriter(src_cluster.connection, ops_per_sec=CRUD_RATE, threads=8, mode="mixed")
+    recorder = PcsmMetricsRecorder(csync).start()
+    try:
+        writer.start()
+        time.sleep(CRUD_SECONDS)
+    finally:
+        writer.stop()
+        recorder.stop()
+    df = recorder.dataframe()
+    steady = df[df["time"] >= WARMUP_SECONDS] if "events_applied_per_sec" in df else df.iloc[0:0]
+    summary = recorder.summary()
+    assert csync.wait_for_zero_lag(timeout=900), "Failed to catch up on replication"
+
+    finalize_start = time.time()
+    assert csync.finalize(timeout=3600), "Failed to finalize csync service"
+    finalize_seconds = time.time() - finalize_start
+    result, _ = compare_data(src_cluster, dst_cluster)
+    assert result is True, "Data mismatch after synchronization"
+
+    MATRIX.add(topology=request.node.callspec.params["cluster_configs"],
+               source=src_cluster.layout, target=dst_cluster.layout,
+               clone_seconds=round(clone_seconds, 1),
+               clone_mb_per_sec=round(dataset_bytes / (1024 * 1024) / clone_seconds, 1),
+               source_ops_per_sec=round(writer.ops / CRUD_SECONDS),
+               steady_events_per_sec=round(float(steady["events_applied_per_sec"].mean())) if not steady.empty else None,
+               max_lag_seconds=summary.get("max_lag_seconds"),
+               peak_cpu_cores=summary.get("peak_cpu_cores"),
+               peak_rss_mb=summary.get("peak_rss_mb"),
+               finalize_seconds=round(finalize_seconds, 1))
+    MATRIX.write()
@@ -0,0 +1,117 @@
+import time
+import pymongo
+import pytest
+
+from benchmark import BenchmarkResults, events_applied, wait_for_drain
+from cluster import Cluster
+from data_integrity_check import compare_data
+from metrics_collector import PCSM_METRIC_PREFIX, PcsmMetricsRecorder
+
+TXN_SIZES = [1, 10, 100, 1000, 10000]
+# target operations per second, the transaction rate is OPS_RATES / size
+OPS_RATES = [2000, 10000]
+DURATION_SECONDS = 60
+DB1, COLL1 = "bench_txn_db1", "txn_coll"
+DB2, COLL2 = "bench_txn_db2", "txn_coll"
+PAYLOAD = "x" * 100
+
+def pin_databases(client, src_cluster):
+    """
+    Puts DB1 and DB2 on different shards with unsharded collections, so a single_shard
+    transaction touches exactly one shard and a cross_shard transaction exactly two
+    """
+    shard_ids = [shard["_id"] for shard in src_cluster.config["shards"][:2]]
+    for db_name, coll_name, shard_id in [(DB1, COLL1, shard_ids[0]), (DB2, COLL2, shard_ids[1])]:
+        client.admin.command({"enableSharding": db_name, "primaryShard": shard_id})
+        client[db_name].create_collection(coll_name)
+
+def run_transactions(client, size, ops_rate, spread, duration, id_base):
+    """
+    Commits transactions of `size` inserts at ops_rate for duration seconds, cross_shard
+    splits each transaction between the two databases pinned to different shards and
+    needs size >= 2.
+    Returns (transactions, operations)
+    """
+    targets = [client[DB1][COLL1], client[DB2][COLL2]] if spread == "cross_shard" else [client[DB1][COLL1]]
+    per_target = max(size // len(targets), 1)
+    # paced by the inserts actually issued, cross_shard rounds odd sizes down
+    interval = per_target * len(targets) / ops_rate
+    transactions = ops = 0
+    next_id = id_base
+    start_time = deadline = time.time()
+    while time.time() - start_time < duration:
+        with client.start_session() as session:
+            with session.start_transaction():
+                for collection in targets:
+                    collection.insert_many([{"_id": next_id + i, "payload": PAYLOAD} for i in range(per_target)],
+                                           session=session)
+                    next_id += per_target
+                    ops += per_target
+        transactions += 1
+        deadline += interval
+        delay = deadline - time.time()
+        if delay > 0:
+            time.sleep(delay)
+    return transactions, ops
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("cluster_configs", ["replicaset", "sharded"], indirect=True)
+@pytest.mark.csync_log_level("info")
+@pytest.mark.timeout(14400, func_only=True)
+def test_bench_transaction_sweep(start_cluster, src_cluster, dst_cluster, csync):
+    """
+    Sweeps transaction size, rate and cross-shard spread and reports PCSM apply
+    throughput, lag, queue size and memory growth for each combination
+    """
+    client = pymongo.MongoClient(src_cluster.connection)
+    spreads = ["single_shard"]
+    if src_cluster.is_sharded:
+        pin_databases(client, src_cluster)
+        spreads.append("cross_shard")
+    else:
+        client[DB1].create_collection(COLL1)
+    assert csync.start(), "Failed to start csync service"
+    assert csync.wait_for_repl_stage(), "Failed to start replication stage"
+
+    results = BenchmarkResults(f"transactions_{src_cluster.layout}")
+    cell = 0
+    for spread in spreads:
+        for ops_rate in OPS_RATES:
+            for size in TXN_SIZES:
+                if spread == "cross_shard" and size < 2:
+                    continue
+                cell += 1
+                recorder = PcsmMetricsRecorder(csync, interval=0.5).start()
+                baseline = events_applied(csync)
+                start_time = time.time()
+                try:
+                    transactions, ops = run_transactions(client, size, ops_rate, spread, DURATION_SECONDS,
+                                                         id_base=cell * 10**9)
+                    source_seconds = time.time() - start_time
+                    drain = wait_for_drain(csync, start_time=start_time, baseline=baseline)
+                finally:
+                    recorder.stop()
+                summary = recorder.summary()
+                df = recorder.dataframe()
+                rss_column = f"{PCSM_METRIC_PREFIX}process_resident_memory_bytes"
+                rss_growth = None
+                if rss_column in df:
+                    rss_growth = round(float(df[rss_column].max() - df[rss_column].iloc[0]) / (1024 * 1024), 1)
+                results.add(spread=spread, txn_size=size, target_ops_per_sec=ops_rate,
+                            transactions=transactions,
+                            ops_per_txn=round(ops / transactions, 1) if transactions else None, achieved_ops_per_sec=round(ops / source_seconds),
+                            applied_events_per_sec=round(drain["events_applied"] / drain["drain_seconds"])
+                            if drain["drain_seconds"] else None,
+                            catch_up_seconds=round(drain["drain_seconds"] - source_seconds, 1)
+                            if drain["drain_seconds"] else None,
+                            max_lag_seconds=summary.get("max_lag_seconds"),
+                            max_queue=summary.get("max_repl_queue_size"),
+                            peak_rss_mb=summary.get("peak_rss_mb"),
+                            rss_growth_mb=rss_growth)
+                assert csync.wait_for_zero_lag(timeout=900), \
+                    f"Failed to catch up after {size}-op transactions at {ops_rate} ops/s ({spread})"
+    results.write()
+    Cluster.log(f"Highest lag: {results.best('max_lag_seconds')}")
+    assert csync.finalize(), "Failed to finalize csync service"
+    result, _ = compare_data(src_cluster, dst_cluster)
+    assert result is True, "Data mismatch after synchronization"
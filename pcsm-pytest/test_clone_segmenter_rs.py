@@ -6,6 +6,12 @@ from data_generator import generate_dummy_data
 from data_integrity_check import compare_data
 
 def _parse_segment_count(csync, namespace):
+    if csync.log_tailer:
+        csync.log_tailer.catch_up()
+        for match in csync.log_tailer.get_matches("segmenter"):
+            if match.group(1) == namespace:
+                return int(match.group(2))
+        return None
     raw_logs = csync.container.logs().decode("utf-8", errors="replace")
     pat = re.compile(
         rf'Segmenter for {re.escape(namespace)}:.*?segments:\s*~(\d+)')
@@ -4,11 +4,22 @@ import argparse
 import os
 import signal
 import threading
+import json
+import multiprocessing
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from bson import ObjectId, BSON
+from bson.raw_bson import RawBSONDocument
 
 DB_NAME = "testdb"
 COLLECTION_PREFIX = "testcol"
 MAX_COLLECTION_BYTES = 5_000_000_000  # 5 GB
+STATS_FLUSH_INTERVAL = 1.0  # seconds between worker process -> parent stats flushes
+# workers are spawned, not forked: the parent already runs the reporter, the metrics server and
+# a MongoClient, and a lock held by one of their threads at fork time would deadlock the child
+MP = multiprocessing.get_context("spawn")
 
 TEMPLATES = {
     "small":   {"size": 500,     "batch": 2000},
@@ -17,11 +28,198 @@ TEMPLATES = {
     "huge":    {"size": 200_000, "batch": 50},
 }
 
-total_inserted = 0
+# Operation mixes as shares of the target rate, counted in documents like --ops; "insert" is one
+# insert_many batch, every other operation touches a single document picked from the ids this
+# writer has inserted, so batches are picked less often in proportion to their size
+PROFILES = {
+    "insert":       {"insert": 100},
+    "read_update":  {"find": 50, "update_set": 50},
+    "update_heavy": {"insert": 10, "find": 10, "update_set": 30, "update_inc": 30, "update_push": 20},
+    "delete_heavy": {"insert": 40, "delete": 60},
+    "upsert":       {"upsert": 100},
+}
+# with the PyMongo C extension encoding bytes padding is a memcpy, so the raw pipeline wins
+# by skipping per-document dict work; above this size the memcpy dominates and PyMongo's
+# extra copy of memoryview-backed RawBSONDocuments makes the dict path faster
+RAW_BSON_MAX_DOC_SIZE = 16 * 1024
+KNOWN_IDS_LIMIT = 100_000  # per writer thread
+PUSH_SLICE = 16  # $push keeps the last N array elements so documents do not grow unbounded
+
+PERCENTILES = (50, 95, 99, 99.9)
+METRICS_PREFIX = "pcsm_loadgen_"
+
+total_ops = 0
 start_time = time.time()
-running = True
+stop_event = threading.Event()
 lock = threading.Lock()
 threads = []
+op_stats = {}
+collection_limits = None
+pool_doc_size = 0
+op_context = threading.local()
+last_interval = {}
+
+
+class LatencyHistogram:
+    # HDR-style log-linear histogram: values (microseconds) are grouped into power-of-two
+    # magnitudes, each split into 2^precision_bits linear sub-buckets, which keeps the
+    # relative error below 1/2^(precision_bits-1) at any magnitude with a bounded bucket count
+    def __init__(self, precision_bits=7):
+        self.precision_bits = precision_bits
+        self.counts = {}
+        self.total = 0
+        self.sum = 0
+        self.max_value = 0
+
+    def _key(self, value):
+        shift = max(0, value.bit_length() - self.precision_bits)
+        return (shift << 32) | (value >> shift)
+
+    @staticmethod
+    def _upper_bound(key):
+        shift, sub = key >> 32, key & 0xFFFFFFFF
+        return ((sub + 1) << shift) - 1
+
+    def record(self, value_us, count=1):
+        value = max(0, int(value_us))
+        key = self._key(value)
+        self.counts[key] = self.counts.get(key, 0) + count
+        self.total += count
+        self.sum += value * count
+        if value > self.max_value:
+            self.max_value = value
+
+    def merge(self, other):
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        self.max_value = max(self.max_value, other.max_value)
+
+    def percentile(self, pct):
+        if self.total == 0:
+            return 0
+        threshold = max(1, self.total * pct / 100.0)
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen >= threshold:
+                return min(self._upper_bound(key), self.max_value)
+        return self.max_value
+
+    def summary(self):
+        result = {"count": self.total, "max_ms": self.max_value / 1000}
+        for pct in PERCENTILES:
+            result[f"p{pct:g}_ms"] = self.percentile(pct) / 1000
+        return result
+
+
+class OpStats:
+    def __init__(self):
+        self.ops = 0
+        self.docs = 0
+        self.bytes = 0
+        self.errors = 0
+        self.interval_docs = 0
+        self.interval = LatencyHistogram()
+        self.overall = LatencyHistogram()
+
+    def record(self, latency_us, docs, nbytes=0):
+        self.ops += 1
+        self.docs += docs
+        self.bytes += nbytes
+        self.interval_docs += docs
+        self.interval.record(latency_us)
+        self.overall.record(latency_us)
+
+    def merge(self, other):
+        self.ops += other.ops
+        self.docs += other.docs
+        self.bytes += other.bytes
+        self.errors += other.errors
+        self.interval_docs += other.docs
+        self.interval.merge(other.overall)
+        self.overall.merge(other.overall)
+
+
+class BacklogStats:
+    # open-loop mode only: operations whose intended start time has passed but which have
+    # not completed yet, and how far behind schedule the dispatcher had to issue them
+    def __init__(self, current=0):
+        self.current = current
+        self.interval_peak = current
+        self.overall_peak = current
+        self.interval_delay = 0.0
+        self.overall_delay = 0.0
+
+    def submitted(self, delay):
+        self.current += 1
+        self.interval_peak = max(self.interval_peak, self.current)
+        self.overall_peak = max(self.overall_peak, self.current)
+        self.interval_delay = max(self.interval_delay, delay)
+        self.overall_delay = max(self.overall_delay, delay)
+
+    def completed(self):
+        self.current -= 1
+
+    def reset_interval(self):
+        self.interval_peak = self.current
+        self.interval_delay = 0.0
+
+    def merge(self, workers):
+        # the backlog is the sum over worker processes of their latest flush; peaks from the
+        # same flush window are added up as if they happened at once, delays are the maximum
+        peak = sum(other.interval_peak for other in workers)
+        self.current = sum(other.current for other in workers)
+        self.interval_peak = max(self.interval_peak, peak)
+        self.overall_peak = max(self.overall_peak, peak)
+        self.interval_delay = max([self.interval_delay] + [other.interval_delay for other in workers])
+        self.overall_delay = max([self.overall_delay] + [other.overall_delay for other in workers])
+
+
+backlog = BacklogStats()
+
+
+def get_op_stats(op):
+    stats = op_stats.get(op)
+    if stats is None:
+        stats = op_stats[op] = OpStats()
+    return stats
+
+
+def record_op(op, latency_us, docs, nbytes=0):
+    with lock:
+        get_op_stats(op).record(latency_us, docs, nbytes)
+
+
+def record_error(op):
+    with lock:
+        get_op_stats(op).errors += 1
+
+
+def timed_op(op, docs, func, *args, nbytes=0, **kwargs):
+    started = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    except Exception:
+        record_error(op)
+        raise
+    finished = time.perf_counter()
+    intended = getattr(op_context, "intended_start", None)
+    if intended is None:
+        record_op(op, (finished - started) * 1_000_000, docs, nbytes)
+    else:
+        # coordinated-omission correction: the latency the application would see is measured
+        # from when the operation was due, the service time alone is kept for comparison and
+        # counts no documents so throughput is not doubled
+        record_op(op, (finished - intended) * 1_000_000, docs, nbytes)
+        record_op(f"{op} (service)", (finished - started) * 1_000_000, 0)
+    return result
+
+
+def format_latency(summary):
+    parts = [f"p{pct:g}={summary[f'p{pct:g}_ms']:.2f}ms" for pct in PERCENTILES]
+    return " ".join(parts) + f" max={summary['max_ms']:.2f}ms"
 
 
 def make_padding(size, compressible):
@@ -69,9 +267,76 @@ def refresh_batch(pool, batch_size):
     return batch
 
 
+def encode_pool(pool):
+    # pool documents differ only in padding content, so they share one encoded length and
+    # the leading "_id" ObjectId sits at the same offset in every document
+    encoded = [BSON.encode(doc) for doc in pool]
+    if len({len(raw) for raw in encoded}) != 1:
+        raise ValueError("Pool documents must have identical encoded sizes for raw BSON batches")
+    return encoded
+
+
+class RawBatch:
+    def __init__(self, raw_pool, batch_size):
+        doc_len = len(raw_pool[0])
+        self.buffer = bytearray(b"".join(raw_pool[i % len(raw_pool)] for i in range(batch_size)))
+        view = memoryview(self.buffer)
+        self.docs = [RawBSONDocument(view[i * doc_len:(i + 1) * doc_len]) for i in range(batch_size)]
+        self.id_offsets = [i * doc_len + RawBatchBuilder.ID_OFFSET for i in range(batch_size)]
+
+
+class RawBatchBuilder:
+    # insert batches over pre-encoded pool documents: each batch owns a buffer holding the
+    # encoded bodies and RawBSONDocument views into it, and only the 12 _id bytes of every
+    # document are rewritten before the batch is reused, so PyMongo copies the bytes as-is
+    # instead of building and encoding a new dict per document
+    ID_OFFSET = 4 + 1 + len(b"_id\x00")
+
+    def __init__(self, raw_pool, batch_size):
+        assert raw_pool[0][self.ID_OFFSET - 5:self.ID_OFFSET] == b"\x07_id\x00"
+        self.raw_pool = raw_pool
+        self.batch_size = batch_size
+        self.free = []
+        self.lock = threading.Lock()
+        # ObjectId layout: 4-byte timestamp, 5 random bytes (one value per builder), 3-byte counter
+        self.random = os.urandom(5)
+        self.counter = random.randrange(0xFFFFFF)
+
+    def acquire(self, count):
+        with self.lock:
+            raw_batch = self.free.pop() if self.free else None
+            first = self.counter
+            self.counter = (self.counter + count) & 0xFFFFFF
+        if raw_batch is None:
+            raw_batch = RawBatch(self.raw_pool, self.batch_size)
+        prefix = int(time.time()).to_bytes(4, "big") + self.random
+        buf = raw_batch.buffer
+        for k, offset in enumerate(raw_batch.id_offsets[:count]):
+            buf[offset:offset + 12] = prefix + ((first + k) & 0xFFFFFF).to_bytes(3, "big")
+        return raw_batch
+
+    def release(self, raw_batch):
+        with self.lock:
+            self.free.append(raw_batch)
+
+    def insert(self, collection, count, op=None, track_ids=False, nbytes=0):
+        raw_batch = self.acquire(count)
+        try:
+            docs = raw_batch.docs[:count]
+            if op is None:
+                collection.insert_many(docs, ordered=False)
+            else:
+                timed_op(op, count, collection.insert_many, docs, ordered=False, nbytes=nbytes)
+            if not track_ids:
+                return []
+            buf = raw_batch.buffer
+            return [ObjectId(bytes(buf[offset:offset + 12])) for offset in raw_batch.id_offsets[:count]]
+        finally:
+            self.release(raw_batch)
+
+
 def signal_handler(sig, frame):
-    global running
-    running = False
+    stop_event.set()
     print("\n[Interrupt received] Shutting down...")
 
 
@@ -100,7 +365,7 @@ def enable_sharding(client, db_name):
             print(f"[Sharding] Warning: Could not enable sharding: {e}")
 
 
-def shard_collection(client, db_name, collection_name, shard_key=None):
+def shard_collection(client, db_name, collection_name, shard_key=None, strict=False):
     if shard_key is None:
         shard_key = {"_id": "hashed"}
     admin_db = client.admin
@@ -112,63 +377,564 @@ def shard_collection(client, db_name, collection_name, shard_key=None):
         msg = str(e).lower()
         if "already sharded" in msg or "already exists" in msg:
             print(f"[Sharding] Collection '{namespace}' is already sharded")
+        elif strict:
+            raise
         else:
             print(f"[Sharding] Warning: Could not shard '{namespace}': {e}")
 
 
-def reporter_thread(interval=5):
-    global total_inserted, start_time
+def reporter_thread(interval=5, open_loop=False):
+    global total_ops, start_time
     last_counter = 0
-    while running:
-        time.sleep(interval)
+    while not stop_event.wait(interval):
         with lock:
             now = time.time()
             elapsed = now - start_time
-            count = total_inserted
+            count = total_ops
+            interval_latency = {}
+            last_interval.clear()
+            for op, stats in op_stats.items():
+                summary = stats.interval.summary()
+                interval_latency[op] = (summary, stats.ops)
+                last_interval[op] = dict(summary, ops_per_sec=summary["count"] / interval,
+                                         docs_per_sec=stats.interval_docs / interval)
+                stats.interval = LatencyHistogram()
+                stats.interval_docs = 0
+            backlog_peak, backlog_delay = backlog.interval_peak, backlog.interval_delay
+            backlog.reset_interval()
         delta = count - last_counter
         iops = delta / interval
         avg = count / elapsed if elapsed > 0 else 0
-        print(f"[{elapsed:.1f}s] Inserts: {count} | IOPS (last {interval}s): {iops:.0f} | Avg IOPS: {avg:.0f}")
+        print(f"[{elapsed:.1f}s] Ops: {count} | IOPS (last {interval}s): {iops:.0f} | Avg IOPS: {avg:.0f}")
+        if open_loop:
+            print(f"[{elapsed:.1f}s]   backlog: peak {backlog_peak} ops | "
+                  f"max dispatch delay {backlog_delay * 1000:.1f}ms")
+        for op, (summary, ops) in sorted(interval_latency.items()):
+            if summary["count"]:
+                print(f"[{elapsed:.1f}s]   {op}: {summary['count'] / interval:.0f} ops/s (total {ops}) | "
+                      f"{format_latency(summary)}")
         last_counter = count
 
 
-def writer_thread(client, collection_name, per_coll_ops, pool, doc_size, batch_size, sharded):
-    global total_inserted
-    db = client[DB_NAME]
-    collection = db[collection_name]
-    batch_interval = batch_size / per_coll_ops
-    next_batch_time = time.time()
-    inserted_in_collection = 0
-
-    while running:
-        estimated_size = inserted_in_collection * doc_size
-        if estimated_size >= MAX_COLLECTION_BYTES:
-            print(f"[Info] Dropping '{collection_name}' (estimated ~{estimated_size / 1024**2:.0f} MB)")
-            collection.drop()
-            collection = db[collection_name]
-            if sharded:
-                shard_collection(client, DB_NAME, collection_name)
-            inserted_in_collection = 0
-
-        batch = refresh_batch(pool, batch_size)
-        collection.insert_many(batch, ordered=False)
-        inserted_in_collection += batch_size
+def write_summary(path, elapsed, open_loop=False):
+    with lock:
+        summary = {
+            "elapsed_sec": round(elapsed, 3),
+            "total_ops": total_ops,
+            "avg_iops": total_ops / elapsed if elapsed > 0 else 0,
+            "ops": {op: {"ops": stats.ops, "docs": stats.docs, "bytes": stats.bytes, "errors": stats.errors,
+                         "ops_per_sec": stats.ops / elapsed if elapsed > 0 else 0,
+                         "latency": stats.overall.summary()}
+                    for op, stats in op_stats.items()},
+            "mix_percent": achieved_mix(op_stats),
+        }
+        if open_loop:
+            summary["backlog"] = {"peak_ops": backlog.overall_peak,
+                                  "max_dispatch_delay_ms": backlog.overall_delay * 1000}
+    for op, data in sorted(summary["ops"].items()):
+        print(f"[Latency] {op}: {data['ops']} ops | {format_latency(data['latency'])}")
+    print(f"[Mix] Achieved, % of documents: "
+          f"{', '.join(f'{op}={share:g}' for op, share in sorted(summary['mix_percent'].items()))}")
+    if open_loop:
+        print(f"[Backlog] Peak {summary['backlog']['peak_ops']} ops | "
+              f"max dispatch delay {summary['backlog']['max_dispatch_delay_ms']:.1f}ms")
+    if path:
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"[Summary] Written to {path}")
+
+
+def render_metrics():
+    def labels(op, **extra):
+        pairs = [f'op="{op}"'] + [f'{k}="{v}"' for k, v in extra.items()]
+        return "{" + ",".join(pairs) + "}"
+
+    with lock:
+        totals = {op: (stats.ops, stats.docs, stats.bytes, stats.errors, stats.overall.total, stats.overall.sum)
+                  for op, stats in op_stats.items()}
+        recent = {op: dict(summary) for op, summary in last_interval.items()}
+        ops_total = total_ops
+        backlog_peak = backlog.interval_peak
+    lines = [
+        f"# HELP {METRICS_PREFIX}ops_total Operations executed, each inserted document counts as one",
+        f"# TYPE {METRICS_PREFIX}ops_total counter",
+        f"{METRICS_PREFIX}ops_total {ops_total}",
+    ]
+    families = [
+        ("operations_total", "counter", "Completed operations per type", lambda t: t[0]),
+        ("documents_total", "counter", "Documents touched per operation type", lambda t: t[1]),
+        ("bytes_written_total", "counter", "Encoded document bytes written per operation type", lambda t: t[2]),
+        ("errors_total", "counter", "Failed operations per type", lambda t: t[3]),
+    ]
+    for name, kind, help_text, value in families:
+        lines += [f"# HELP {METRICS_PREFIX}{name} {help_text}", f"# TYPE {METRICS_PREFIX}{name} {kind}"]
+        lines += [f"{METRICS_PREFIX}{name}{labels(op)} {value(t)}" for op, t in sorted(totals.items())]
+    # documents per second like pcsm-pytest/loadgen_metrics.py and pcsm-functional/scripts/load_data.py,
+    # operation calls are in operations_total
+    lines += [f"# HELP {METRICS_PREFIX}ops_per_second Documents per second over the last report interval",
+              f"# TYPE {METRICS_PREFIX}ops_per_second gauge"]
+    lines += [f"{METRICS_PREFIX}ops_per_second{labels(op)} {summary['docs_per_sec']:.3f}"
+              for op, summary in sorted(recent.items())]
+    lines += [f"# HELP {METRICS_PREFIX}latency_seconds Operation latency, quantiles over the last report interval",
+              f"# TYPE {METRICS_PREFIX}latency_seconds summary"]
+    for op, t in sorted(totals.items()):
+        summary = recent.get(op)
+        if summary:
+            for pct in PERCENTILES:
+                quantile = f"{pct / 100:g}"
+                lines.append(f"{METRICS_PREFIX}latency_seconds{labels(op, quantile=quantile)} "
+                             f"{summary[f'p{pct:g}_ms'] / 1000:.6f}")
+            lines.append(f"{METRICS_PREFIX}latency_seconds{labels(op, quantile='1')} {summary['max_ms'] / 1000:.6f}")
+        lines.append(f"{METRICS_PREFIX}latency_seconds_sum{labels(op)} {t[5] / 1_000_000:.6f}")
+        lines.append(f"{METRICS_PREFIX}latency_seconds_count{labels(op)} {t[4]}")
+    lines += [f"# HELP {METRICS_PREFIX}backlog_ops Open-loop operations due but not completed (peak since last report)",
+              f"# TYPE {METRICS_PREFIX}backlog_ops gauge",
+              f"{METRICS_PREFIX}backlog_ops {backlog_peak}"]
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port):
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"[Metrics] Prometheus endpoint on http://0.0.0.0:{port}/metrics")
+    return server
+
+
+class CollectionLimits:
+    # shared by all worker processes: documents written per collection since its last drop and
+    # the writers in flight on it; the writer that crosses the size limit becomes the only one
+    # allowed to drop and re-shard the collection, every other writer waits in enter() until it
+    # is done so no insert can recreate the collection unsharded in between
+    def __init__(self, collections):
+        self.cond = MP.Condition()
+        self.docs = MP.Array("q", collections, lock=False)
+        self.active = MP.Array("q", collections, lock=False)
+        self.recreating = MP.Array("b", collections, lock=False)
+        self.generation = MP.Array("q", collections, lock=False)
+        self.failed = MP.Value("b", 0, lock=False)
+
+    def enter(self, index):
+        with self.cond:
+            while self.recreating[index]:
+                self.cond.wait()
+            self.active[index] += 1
+            return self.generation[index]
+
+    def leave(self, index, docs=0):
+        # returns the documents written since the last drop when the caller has to drop the collection
+        with self.cond:
+            self.active[index] -= 1
+            if self.recreating[index]:
+                self.cond.notify_all()
+            self.docs[index] += docs
+            count = self.docs[index]
+            if not docs or count * pool_doc_size < MAX_COLLECTION_BYTES:
+                return None
+            self.docs[index] = 0
+            self.recreating[index] = 1
+            while self.active[index] and not stop_event.is_set():
+                self.cond.wait(0.5)
+        return count
+
+    def recreated(self, index, ok):
+        with self.cond:
+            self.recreating[index] = 0
+            self.generation[index] += 1
+            if not ok:
+                self.failed.value = 1
+            self.cond.notify_all()
+
+
+class KnownIds:
+    # ids inserted by one writer; bounded, with O(1) random pick and removal
+    def __init__(self, limit=KNOWN_IDS_LIMIT):
+        self.limit = limit
+        self.ids = []
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, ids):
+        with self.lock:
+            for _id in ids:
+                if len(self.ids) < self.limit:
+                    self.ids.append(_id)
+                else:
+                    self.ids[random.randrange(self.limit)] = _id
+
+    def pick(self):
+        with self.lock:
+            if not self.ids:
+                return None
+            return self.ids[random.randrange(len(self.ids))]
+
+    def take(self):
+        with self.lock:
+            if not self.ids:
+                return None
+            i = random.randrange(len(self.ids))
+            self.ids[i], self.ids[-1] = self.ids[-1], self.ids[i]
+            return self.ids.pop()
+
+    def clear(self):
+        with self.lock:
+            self.ids.clear()
+
+
+class WriterState:
+    def __init__(self, client, index, pool, raw_pool, batch_size, sharded, track_ids):
+        self.client = client
+        self.index = index
+        self.name = f"{COLLECTION_PREFIX}_{index}"
+        self.collection = client[DB_NAME][self.name]
+        self.pool = pool
+        self.raw_batches = RawBatchBuilder(raw_pool, batch_size) if raw_pool else None
+        self.batch_size = batch_size
+        self.sharded = sharded
+        self.track_ids = track_ids
+        self.known_ids = KnownIds()
+        self.counter = 0
+        self.generation = 0
+
+    def guarded(self, func, *args, written=0):
+        generation = collection_limits.enter(self.index)
+        if generation != self.generation:
+            # another writer dropped the collection, the ids inserted before are gone
+            self.known_ids.clear()
+            self.generation = generation
+        try:
+            result = func(*args)
+        except Exception:
+            collection_limits.leave(self.index)
+            raise
+        dropped_docs = collection_limits.leave(self.index, written)
+        if dropped_docs is not None:
+            self.recreate(dropped_docs)
+        return result
+
+    def run(self, op):
+        return self.guarded(OPERATIONS[op], self, written=self.batch_size if op == "insert" else 0)
+
+    def recreate(self, docs):
+        print(f"[Info] Dropping '{self.name}' (estimated ~{docs * pool_doc_size / 1024**2:.0f} MB)")
+        ok = False
+        try:
+            self.collection.drop()
+            if self.sharded:
+                shard_collection(self.client, DB_NAME, self.name, strict=True)
+            ok = True
+        except Exception as e:
+            print(f"[Error] Could not recreate '{self.name}', stopping: {e}")
+            stop_event.set()
+            raise
+        finally:
+            collection_limits.recreated(self.index, ok)
+
+    def insert_batch(self, count, op=None, nbytes=0):
+        if self.raw_batches is not None:
+            ids = self.raw_batches.insert(self.collection, count, op, self.track_ids, nbytes)
+        else:
+            batch = refresh_batch(self.pool, count)
+            if op is None:
+                self.collection.insert_many(batch, ordered=False)
+            else:
+                timed_op(op, count, self.collection.insert_many, batch, ordered=False, nbytes=nbytes)
+            ids = [doc["_id"] for doc in batch] if self.track_ids else []
+        self.known_ids.add(ids)
+
+
+def op_insert(state):
+    state.insert_batch(state.batch_size, "insert", nbytes=state.batch_size * pool_doc_size)
+    return state.batch_size
+
+
+def op_find(state):
+    timed_op("find", 1, state.collection.find_one, {"_id": state.known_ids.pick()})
+    return 1
+
+
+def op_update_set(state):
+    state.counter += 1
+    update = {"$set": {"s": f"bench-{state.counter}", "f": random.random()}}
+    timed_op("update_set", 1, state.collection.update_one, {"_id": state.known_ids.pick()}, update)
+    return 1
+
+
+def op_update_inc(state):
+    timed_op("update_inc", 1, state.collection.update_one, {"_id": state.known_ids.pick()}, {"$inc": {"i": 1}})
+    return 1
+
+
+def op_update_push(state):
+    state.counter += 1
+    update = {"$push": {"a": {"$each": [state.counter], "$slice": -PUSH_SLICE}}}
+    timed_op("update_push", 1, state.collection.update_one, {"_id": state.known_ids.pick()}, update)
+    return 1
+
+
+def op_delete(state):
+    timed_op("delete", 1, state.collection.delete_one, {"_id": state.known_ids.take()})
+    return 1
+
+
+def op_upsert(state):
+    # half of the upserts hit an existing document, the rest insert a new one
+    if state.known_ids and random.random() < 0.5:
+        _id, nbytes = state.known_ids.pick(), 0
+    else:
+        _id, nbytes = ObjectId(), pool_doc_size
+        state.known_ids.add([_id])
+    body = {k: v for k, v in state.pool[random.randrange(len(state.pool))].items() if k not in ("_id", "i")}
+    update = {"$inc": {"i": 1}, "$setOnInsert": body}
+    timed_op("upsert", 1, state.collection.update_one, {"_id": _id}, update, upsert=True, nbytes=nbytes)
+    return 1
+
+
+OPERATIONS = {
+    "insert": op_insert,
+    "find": op_find,
+    "update_set": op_update_set,
+    "update_inc": op_update_inc,
+    "update_push": op_update_push,
+    "delete": op_delete,
+    "upsert": op_upsert,
+}
+NEEDS_KNOWN_IDS = {"find", "update_set", "update_inc", "update_push", "delete"}
+
+
+def parse_mix(profile, mix):
+    if not mix:
+        return dict(PROFILES[profile])
+    weights = {}
+    for item in mix.split(","):
+        op, _, weight = item.partition("=")
+        op = op.strip()
+        if op not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{op}' in --mix, expected one of {', '.join(OPERATIONS)}")
+        weights[op] = float(weight) if weight else 1.0
+    if not any(weights.values()):
+        raise ValueError("--mix must give at least one operation a positive weight")
+    return weights
 
+
+def prefill(state, docs):
+    inserted = 0
+    while inserted < docs and not stop_event.is_set():
+        count = min(state.batch_size, docs - inserted)
+        state.guarded(state.insert_batch, count, written=count)
+        inserted += count
+
+
+def pick_weights(state, ops, weights):
+    # a batch insert spends batch_size documents of the rate budget, dividing by the cost makes
+    # every operation's share of the documents written match its weight in the mix
+    return [weight / op_cost(state, op) for op, weight in zip(ops, weights)]
+
+
+def achieved_mix(stats):
+    docs = {op: s.docs for op, s in stats.items() if not op.endswith(" (service)")}
+    total = sum(docs.values())
+    return {op: round(100 * count / total, 1) for op, count in docs.items()} if total else {}
+
+
+def choose_op(state, ops, weights):
+    op = random.choices(ops, weights)[0]
+    if op in NEEDS_KNOWN_IDS and not state.known_ids:
+        op = "insert"
+    return op
+
+
+def op_cost(state, op):
+    return state.batch_size if op == "insert" else 1
+
+
+def run_scheduled(state, op, intended_start):
+    global total_ops
+    op_context.intended_start = intended_start
+    try:
+        cost = state.run(op)
         with lock:
-            total_inserted += batch_size
+            total_ops += cost
+    except Exception as e:
+        print(f"[Error] {op} on '{state.name}' failed: {e}")
+    finally:
+        op_context.intended_start = None
+        with lock:
+            backlog.completed()
+
+
+def open_loop_writer(state, ops, weights, per_coll_ops, concurrency, max_backlog):
+    # operations are dispatched at their scheduled times whether or not earlier ones have
+    # completed, so a stalled server shows up as latency and backlog instead of lower load
+    slots = threading.BoundedSemaphore(max_backlog)
+    intended_start = time.perf_counter()
+
+    def release(_):
+        slots.release()
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=state.name) as executor:
+        while not stop_event.is_set():
+            op = choose_op(state, ops, weights)
+            delay = intended_start - time.perf_counter()
+            if delay > 0 and stop_event.wait(delay):
+                break
+            while not slots.acquire(timeout=0.5):
+                if stop_event.is_set():
+                    return
+            with lock:
+                backlog.submitted(max(0.0, time.perf_counter() - intended_start))
+            future = executor.submit(run_scheduled, state, op, intended_start)
+            future.add_done_callback(release)
+            intended_start += op_cost(state, op) / per_coll_ops
+
+
+def writer_thread(client, index, per_coll_ops, pool, raw_pool, batch_size, sharded, mix, prefill_docs,
+                  open_loop=None):
+    global total_ops
+    ops, weights = zip(*mix.items())
+    state = WriterState(client, index, pool, raw_pool, batch_size, sharded, track_ids=set(ops) != {"insert"})
+    weights = pick_weights(state, ops, weights)
+    if prefill_docs and NEEDS_KNOWN_IDS.intersection(ops):
+        prefill(state, prefill_docs)
+    if open_loop:
+        open_loop_writer(state, ops, weights, per_coll_ops, *open_loop)
+        return
+    next_op_time = time.time()
 
-        next_batch_time += batch_interval
-        sleep_time = next_batch_time - time.time()
+    while not stop_event.is_set():
+        op = choose_op(state, ops, weights)
+        try:
+            cost = state.run(op)
+        except Exception as e:
+            print(f"[Error] {op} on '{state.name}' failed: {e}")
+            cost = op_cost(state, op)
+        else:
+            with lock:
+                total_ops += cost
+
+        next_op_time += cost / per_coll_ops
+        sleep_time = next_op_time - time.time()
         if sleep_time > 0:
             time.sleep(sleep_time)
         else:
-            next_batch_time = time.time()
+            next_op_time = time.time()
+
+
+def use_raw_encoder(encoder, doc_size):
+    if encoder == "auto":
+        return doc_size <= RAW_BSON_MAX_DOC_SIZE
+    return encoder == "raw"
+
+
+def start_writers(client, args, per_coll_ops, pool, batch_size, sharded):
+    mix = parse_mix(args.profile, args.mix)
+    open_loop = (args.concurrency, args.max_backlog) if args.open_loop else None
+    raw_pool = encode_pool(pool) if use_raw_encoder(args.encoder, pool_doc_size) else None
+    for i in range(args.collections):
+        t = threading.Thread(target=writer_thread,
+                             args=(client, i, per_coll_ops, pool, raw_pool, batch_size, sharded, mix, args.prefill,
+                                   open_loop))
+        t.start()
+        threads.append(t)
+
+
+def flush_stats(queue, worker_id):
+    global op_stats, total_ops, backlog
+    with lock:
+        snapshot, op_stats = op_stats, {}
+        done, total_ops = total_ops, 0
+        backlog_snapshot, backlog = backlog, BacklogStats(backlog.current)
+    queue.put((worker_id, done, snapshot, backlog_snapshot))
+
+
+def worker_process(worker_id, uri, args, batch_size, sharded, stop, queue, limits):
+    global stop_event, collection_limits, pool_doc_size
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    stop_event = stop
+    collection_limits = limits
+    try:
+        pool, doc_size = build_pool(args.template, args.compressible, batch_size)
+        pool_doc_size = doc_size
+        client = pymongo.MongoClient(uri)
+        per_coll_ops = args.ops / args.collections / args.processes
+        start_writers(client, args, per_coll_ops, pool, batch_size, sharded)
+        while not stop_event.wait(STATS_FLUSH_INTERVAL):
+            flush_stats(queue, worker_id)
+        for t in threads:
+            t.join()
+    except Exception as e:
+        print(f"[Worker {worker_id}] Error: {e}")
+        stop_event.set()
+    finally:
+        flush_stats(queue, worker_id)
+        queue.put(None)
+
+
+def collector_thread(queue, workers):
+    global total_ops
+    remaining = workers
+    latest_backlog = {}
+    while remaining:
+        item = queue.get()
+        if item is None:
+            remaining -= 1
+            continue
+        worker_id, done, snapshot, backlog_snapshot = item
+        latest_backlog[worker_id] = backlog_snapshot
+        with lock:
+            total_ops += done
+            backlog.merge(latest_backlog.values())
+            for op, stats in snapshot.items():
+                if op not in op_stats:
+                    op_stats[op] = OpStats()
+                op_stats[op].merge(stats)
+
+
+def run_processes(uri, args, batch_size, sharded):
+    mp_stop = MP.Event()
+    queue = MP.Queue()
+    workers = []
+    for worker_id in range(args.processes):
+        p = MP.Process(target=worker_process,
+                       args=(worker_id, uri, args, batch_size, sharded, mp_stop, queue, collection_limits))
+        p.start()
+        workers.append(p)
+    ct = threading.Thread(target=collector_thread, args=(queue, len(workers)))
+    ct.start()
+    try:
+        while not stop_event.wait(0.5):
+            if not any(p.is_alive() for p in workers):
+                break
+    except KeyboardInterrupt:
+        pass
+    mp_stop.set()
+    ct.join()
+    for p in workers:
+        p.join()
 
 
 def main():
-    global start_time
-    parser = argparse.ArgumentParser(description="MongoDB insert load generator")
-    parser.add_argument("--ops", type=int, default=100, help="Target inserts per second (default: 100)")
+    global start_time, collection_limits, pool_doc_size
+    parser = argparse.ArgumentParser(description="MongoDB CRUD load generator")
+    parser.add_argument("--ops", type=int, default=100,
+                        help="Target operations per second, each inserted document counts as one (default: 100)")
     parser.add_argument("--collections", type=int, default=1, help="Number of collections (default: 1)")
     parser.add_argument("-u", "--user", type=str, default=None, help="MongoDB username")
     parser.add_argument("-p", "--password", type=str, default=None, help="MongoDB password")
@@ -180,7 +946,47 @@ def main():
                         help="Use compressible padding (repeating pattern); default is random bytes")
     parser.add_argument("--batch-size", type=int, default=None,
                         help="Documents per insert_many call (auto-set per template if omitted)")
+    parser.add_argument("--profile", type=str, default="insert", choices=list(PROFILES.keys()),
+                        help="Operation mix: insert (insert_many only), read_update (50/50 find and $set), "
+                             "update_heavy ($set/$inc/$push), delete_heavy, upsert (default: insert)")
+    parser.add_argument("--mix", type=str, default=None,
+                        help="Custom operation weights overriding --profile, as shares of the documents written, "
+                             "e.g. 'insert=20,update_set=50,delete=30'; "
+                             f"operations: {', '.join(OPERATIONS)}")
+    parser.add_argument("--prefill", type=int, default=10_000,
+                        help="Documents inserted per collection before the timed run when the mix reads, updates "
+                             "or deletes existing documents (default: 10000)")
+    parser.add_argument("--open-loop", action="store_true",
+                        help="Issue operations at their scheduled times regardless of completion and measure "
+                             "latency from the scheduled start (coordinated-omission correction); the default "
+                             "closed loop waits for each operation, so server stalls lower the offered load")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="Open-loop only: operations in flight per collection (default: 16)")
+    parser.add_argument("--max-backlog", type=int, default=10_000,
+                        help="Open-loop only: scheduled operations allowed to wait for a free connection per "
+                             "collection before dispatch pauses; latency keeps counting from the schedule "
+                             "(default: 10000)")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Worker processes sharing the target rate, each with its own client and "
+                             "document pool (default: 1, run writers in this process)")
+    parser.add_argument("--encoder", type=str, default="auto", choices=["auto", "raw", "dict"],
+                        help="Insert batch pipeline: raw (pool documents pre-encoded once into reusable buffers, "
+                             "only _id bytes rewritten per document), dict (documents copied and encoded by PyMongo "
+                             f"on every insert), auto (raw up to {RAW_BSON_MAX_DOC_SIZE // 1024} KB documents, "
+                             "dict above) (default: auto)")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="Serve Prometheus metrics (ops/sec, latency quantiles, errors, bytes written) on "
+                             "this port at /metrics (default: 0, disabled)")
+    parser.add_argument("--report-interval", type=int, default=5,
+                        help="Seconds between progress and latency reports (default: 5)")
+    parser.add_argument("--summary-file", type=str, default=None,
+                        help="Write the final JSON summary with per-op latency percentiles to this path "
+                             "(default: not written)")
     args = parser.parse_args()
+    try:
+        mix = parse_mix(args.profile, args.mix)
+    except ValueError as e:
+        parser.error(str(e))
 
     if args.user and args.password:
         uri = f"mongodb://{args.user}:{args.password}@{args.host}"
@@ -189,15 +995,26 @@ def main():
 
     tmpl = TEMPLATES[args.template]
     batch_size = args.batch_size if args.batch_size is not None else tmpl["batch"]
-    pool, doc_size = build_pool(args.template, args.compressible, batch_size)
+    if args.processes > 1:
+        pool = None
+    else:
+        pool, doc_size = build_pool(args.template, args.compressible, batch_size)
+        pool_doc_size = doc_size
+    collection_limits = CollectionLimits(args.collections)
 
     mode = "compressible" if args.compressible else "incompressible (random)"
     print(f"[Config] Template: {args.template} (~{tmpl['size']/1024:.1f} KB target) | Data: {mode}")
     print(f"[Config] {args.ops} ops/sec across {args.collections} collection(s), batch size {batch_size}")
+    encoder = "raw" if use_raw_encoder(args.encoder, tmpl["size"]) else "dict"
+    print(f"[Config] Insert encoder: {encoder}")
+    print(f"[Config] Operation mix, share of documents: {', '.join(f'{op}={weight:g}' for op, weight in mix.items())}")
+    if args.open_loop:
+        print(f"[Config] Open loop: {args.concurrency} in flight, up to {args.max_backlog} queued per collection")
+    if args.processes > 1:
+        print(f"[Config] {args.processes} worker processes, ~{args.ops / args.processes:.0f} ops/sec each")
     print(f"[Config] URI: {uri}")
 
     signal.signal(signal.SIGINT, signal_handler)
-    per_coll_ops = args.ops / args.collections
     client = pymongo.MongoClient(uri)
 
     sharded = is_sharded_cluster(client)
@@ -211,26 +1028,29 @@ def main():
         print("[Topology] Detected replica set / standalone — skipping sharding")
 
     start_time = time.time()
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
 
-    rt = threading.Thread(target=reporter_thread, daemon=True)
+    rt = threading.Thread(target=reporter_thread, args=(args.report_interval, args.open_loop), daemon=True)
     rt.start()
 
-    for i in range(args.collections):
-        coll_name = f"{COLLECTION_PREFIX}_{i}"
-        t = threading.Thread(target=writer_thread, args=(client, coll_name, per_coll_ops, pool, doc_size, batch_size, sharded))
-        t.start()
-        threads.append(t)
-
-    try:
-        for t in threads:
-            t.join()
-    except KeyboardInterrupt:
-        pass
+    if args.processes > 1:
+        run_processes(uri, args, batch_size, sharded)
+    else:
+        start_writers(client, args, args.ops / args.collections, pool, batch_size, sharded)
+        try:
+            for t in threads:
+                t.join()
+        except KeyboardInterrupt:
+            pass
 
     elapsed = time.time() - start_time
-    avg_iops = total_inserted / elapsed if elapsed > 0 else 0
-    print(f"\n[Done] Inserted {total_inserted} documents in {elapsed:.2f} seconds.")
+    avg_iops = total_ops / elapsed if elapsed > 0 else 0
+    print(f"\n[Done] Executed {total_ops} operations in {elapsed:.2f} seconds.")
     print(f"[Summary] Avg IOPS: {avg_iops:.2f}")
+    write_summary(args.summary_file, elapsed, args.open_loop)
+    if collection_limits.failed.value:
+        sys.exit("[Error] A collection could not be dropped and re-sharded at the size limit")
 
 
 if __name__ == "__main__":